@@ -0,0 +1,89 @@
+"""Compara los motores de consulta pandas y DuckDB en las agregaciones del dashboard.
+
+Uso (desde la raíz del proyecto; DuckDB se instala con
+`pip install -r requirements-bench.txt` y, si falta, solo se mide pandas):
+
+    python -m benchmarks.bench_backends --rows 100000 1000000 10000000
+
+Para cada tamaño genera una expansión sintética del CSV, la guarda en un
+Parquet temporal y mide cada consulta lógica con los dos motores: pandas
+sobre el cubo y las filas en memoria, DuckDB directamente sobre el Parquet.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cobertura import DATA_PATH, Dataset, read_csv
+from cobertura.backends import DuckDBBackend, PandasBackend, duckdb
+from cobertura.cache import ROW_GROUP_SIZE
+from cobertura.metrics import MAIN_TECHNOLOGIES, TECHNOLOGIES
+from cobertura.synthetic import expand_sample
+from benchmarks.bench_coverage import timed
+
+SOCIO_COLUMNS = ('INGRESO_PROMEDIO_HOGAR', 'TASA_POBREZA', 'INDICE_NBI', 'PCT_HOGARES_INTERNET')
+
+
+def queries(backend, selection):
+    """Las consultas de `aggregates` que resuelve el motor."""
+    return [
+        ('resumen de cobertura', lambda: backend.coverage_counts(selection, tuple(TECHNOLOGIES))),
+        ('métricas del mapa por departamento', lambda: backend.department_metrics(selection)),
+        ('heatmap por proveedor', lambda: backend.coverage_by(
+            'NOMBRE_PROVEEDOR_COMERCIAL', selection, MAIN_TECHNOLOGIES)),
+        ('serie anual de cobertura', lambda: backend.coverage_by('AÑO', selection, MAIN_TECHNOLOGIES, tidy=True)),
+        ('serie anual de indicadores', lambda: backend.mean_by('AÑO', SOCIO_COLUMNS, selection)),
+        ('indicadores por estrato', lambda: backend.mean_by('ESTRATO_PROMEDIO', SOCIO_COLUMNS, selection)),
+        ('matriz de correlación', lambda: backend.correlation(SOCIO_COLUMNS, selection)),
+    ]
+
+
+def run(sample, rows, args, directory):
+    typed = expand_sample(sample, rows, args.seed)
+    parquet_path = os.path.join(directory, f'filas-{rows}.parquet')
+    pq.write_table(pa.Table.from_pandas(typed, preserve_index=False), parquet_path, row_group_size=ROW_GROUP_SIZE)
+
+    start = time.perf_counter()
+    dataset = Dataset(typed, f'bench-{rows}')
+    backends = [('pandas', PandasBackend(dataset), (time.perf_counter() - start) * 1000)]
+    # Sin duckdb se mide solo pandas (ver el aviso de `main`)
+    if duckdb is not None:
+        start = time.perf_counter()
+        duck = DuckDBBackend(dataset, parquet=parquet_path)
+        backends.append(('duckdb', duck, (time.perf_counter() - start) * 1000))
+
+    ratio = len(backends) == 2
+    print(f'\nFilas: {rows:,} | repeticiones: {args.repeat}')
+    print(f'{"consulta":<40}' + ''.join(f' {name:>12}' for name, _, _ in backends)
+          + (f' {"pandas/duckdb":>14}' if ratio else ''))
+    print(f'{"preparación (cubo + índice / vista)":<40}' + ''.join(f' {ms:9.1f} ms' for _, _, ms in backends))
+    for label, selection in (('', {}), (' [AÑO=2022]', {'AÑO': 2022})):
+        cases = zip(*(queries(backend, selection) for _, backend, _ in backends))
+        for case in cases:
+            times = [timed(query, args.repeat) for _, query in case]
+            line = f'{case[0][0] + label:<40}' + ''.join(f' {ms:9.1f} ms' for ms in times)
+            print(line + (f' {times[0] / times[1]:13.1f}x' if ratio else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if duckdb is None:
+        print('duckdb no está instalado: se omite el motor DuckDB y solo se mide pandas '
+              '(pip install -r requirements-bench.txt)')
+
+    sample = read_csv(DATA_PATH)
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            run(sample, rows, args, directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Compara las métricas de cobertura con lambdas contra las reducciones nativas.
+
+Uso (desde la raíz del proyecto):
+
+    python -m benchmarks.bench_coverage --rows 5000000
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from cobertura import DATA_PATH, CoverageCube, coverage_by, parallel, read_csv
+from cobertura.synthetic import expand_sample
+
+
+def timed(func, repeat):
+    """Mediana en milisegundos de `repeat` ejecuciones."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    raw = expand_sample(pd.read_csv(DATA_PATH), args.rows, args.seed)
+    typed = expand_sample(read_csv(DATA_PATH), args.rows, args.seed)
+    cube = CoverageCube.from_frame(typed)
+
+    cases = [
+        ('apply(lambda) sobre texto SÍ/NO (tab7 original)', lambda: raw.groupby('DEPARTAMENTO').apply(
+            lambda x: (x['COBERTURA_4G'] == 'SÍ').mean() * 100)),
+        ('agg(lambda) sobre texto SÍ/NO (map_data original)', lambda: raw.groupby('DEPARTAMENTO').agg({
+            'COBERTURA_4G': lambda x: (x == 'SÍ').mean() * 100,
+            'COBERTURA_5G': lambda x: (x == 'SÍ').mean() * 100,
+        })),
+        ('coverage_by sobre filas, 4G y 5G', lambda: coverage_by(typed, 'DEPARTAMENTO', techs=['4G', '5G'])),
+        ('coverage_by sobre filas, 6 tecnologías', lambda: coverage_by(
+            typed, 'DEPARTAMENTO', techs=['2G', '3G', 'HSPA_HSPA_DC', '4G', 'LTE', '5G'])),
+        ('coverage_by sobre el cubo, 4G y 5G', lambda: coverage_by(cube, 'DEPARTAMENTO', techs=['4G', '5G'])),
+        ('cubo: from_frame en un hilo', lambda: CoverageCube.from_frame(typed)),
+        (f'cubo: build por bloques ({parallel.workers()} hilos)', lambda: CoverageCube.build(typed)),
+    ]
+
+    print(f'Filas: {args.rows:,} | celdas del cubo: {len(cube.cells):,} | repeticiones: {args.repeat}')
+    baseline = None
+    for name, func in cases:
+        elapsed = timed(func, args.repeat)
+        baseline = baseline or elapsed
+        print(f'{name:<52} {elapsed:10.1f} ms  x{baseline / elapsed:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Mide de extremo a extremo las rutas de cálculo de los dashboards con datos sintéticos.
+
+Uso (desde la raíz del proyecto):
+
+    python -m benchmarks.bench_dashboard --rows 1000000 --save benchmarks/baselines/1m.json
+    python -m benchmarks.bench_dashboard --rows 1000000 --compare benchmarks/baselines/1m.json
+
+Genera un CSV sintético con el esquema del original (`cobertura.synthetic`) y
+mide, sin navegador:
+
+- carga: CSV a `Dataset` sin caché y desde la caché en disco
+- filtros: selecciones de la barra lateral sobre el índice de filtros
+- agregados: las secciones de `cobertura.report` (lo que calcula cada sección)
+- figuras: los constructores de `charts` (Plotly) e `images` (matplotlib)
+- app: cada sección de `dashboard_cobertura.py` y `dashboard_simple.py`
+  ejecutada con `streamlit.testing` (se omite con `--no-app`)
+
+Cada caso se ejecuta `--repeat` veces con las cachés de resultados vacías y
+reporta percentiles de latencia más el pico de memoria (tracemalloc) de una
+ejecución adicional. tracemalloc no ve los buffers de pyarrow; el RSS máximo
+del proceso completo se informa al final. `--save` guarda los resultados como línea base y
+`--compare` marca los casos más lentos o con más memoria que la línea base
+por encima de `--tolerance` (y de `--min-delta-ms`, para no marcar ruido en
+casos de pocos milisegundos); en ese caso el proceso termina con código 1.
+Las líneas base dependen de la máquina: compárese siempre en el mismo host.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from cobertura import aggregates, charts, images
+from cobertura.dataset import Dataset
+from cobertura.loader import DATA_ENV
+from cobertura.memo import clear_caches
+from cobertura.memory import MemoryGuard
+from cobertura.metrics import MAIN_TECHNOLOGIES
+from cobertura.report import SECTIONS, SOCIO_COLUMNS
+from cobertura.synthetic import write_csv
+
+DASHBOARDS = ['dashboard_cobertura.py', 'dashboard_simple.py']
+
+
+def selections(dataset):
+    """Selecciones típicas de la barra lateral."""
+    year, department, provider = dataset.years[-1], dataset.departments[0], dataset.providers[0]
+    return {
+        'todo': {},
+        'año': {'AÑO': year},
+        'departamento': {'DEPARTAMENTO': department},
+        'año+proveedor': {'AÑO': year, 'NOMBRE_PROVEEDOR_COMERCIAL': provider},
+    }
+
+
+def figures(dataset):
+    """Un constructor de cada tipo de gráfico con los datos de la selección completa."""
+    counts = aggregates.coverage_summary(dataset, {})
+    departments = aggregates.value_counts(dataset, {}, 'DEPARTAMENTO').head(10)
+    heatmap = aggregates.provider_coverage(dataset, {})[MAIN_TECHNOLOGIES].T
+    yearly = aggregates.yearly_coverage(dataset, {})
+    socio = aggregates.yearly_means(dataset, {}, SOCIO_COLUMNS)
+    map_data = aggregates.department_map(dataset, {})
+    return {
+        'plotly/bar': lambda: charts.bar(counts, 'Cobertura', 'Tecnología', 'Localidades', 'Blues'),
+        'plotly/hbar': lambda: charts.hbar(departments, 'Departamentos', 'Registros', 'Departamento', 'Reds'),
+        'plotly/pie': lambda: charts.pie(counts, 'Cobertura'),
+        'plotly/heatmap': lambda: charts.heatmap(heatmap, 'Proveedores', 'RdYlGn'),
+        'plotly/line': lambda: charts.line(yearly, 'Año', 'Cobertura_%', 'Tecnología', 'Serie', {}),
+        'plotly/small_multiples': lambda: charts.small_multiples(
+            socio, 'AÑO', SOCIO_COLUMNS, tuple(SOCIO_COLUMNS), SOCIO_COLUMNS, rows=2, cols=2),
+        'plotly/mapa': lambda: charts.department_map(map_data, 'Cobertura_4G_%'),
+        'matplotlib/bar': lambda: images.bar_chart(counts, 'Cobertura', 'Tecnología', 'Localidades', 'skyblue'),
+        'matplotlib/pie': lambda: images.pie_chart(counts, 'Cobertura'),
+        'matplotlib/lineas': lambda: images.line_panels(
+            socio, 'AÑO', [(col, col, col, 'o', 'green') for col in SOCIO_COLUMNS], 'Año'),
+    }
+
+
+def measure(func, repeat, setup=None):
+    """Latencias en ms de `repeat` ejecuciones y pico de memoria de una más."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    if setup:
+        setup()
+    with MemoryGuard(label='benchmark') as guard:
+        func()
+    tracemalloc.stop()
+    return {
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'max_ms': max(samples),
+        'peak_mb': guard.peak_mb,
+        'runs': repeat,
+    }
+
+
+def run_library(path, args, results):
+    cache_dir = os.path.join(os.path.dirname(path), '.cache')
+
+    def cold():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    results['carga/csv'] = measure(lambda: Dataset.load(path), args.load_repeat, cold)
+    results['carga/cache'] = measure(lambda: Dataset.load(path), args.repeat)
+    dataset = Dataset.load(path)
+
+    for name, selection in selections(dataset).items():
+        results[f'filtros/{name}'] = measure(lambda: dataset.view(selection), args.repeat, dataset.filters.clear)
+        for section, compute in SECTIONS.items():
+            results[f'agregados/{section}/{name}'] = measure(
+                lambda: compute(dataset, selection), args.repeat, clear_caches)
+
+    builders = figures(dataset)
+    for name, build in builders.items():
+        results[f'figuras/{name}'] = measure(build, args.repeat, _clear_figures)
+
+
+def _clear_figures():
+    for module in (charts, images):
+        for value in vars(module).values():
+            if hasattr(value, 'cache') and hasattr(value.cache, 'clear'):
+                value.cache.clear()
+
+
+def run_app(path, args, results):
+    """Cada sección de los dashboards reales, con las cachés de resultados vacías."""
+    from streamlit.testing.v1 import AppTest
+
+    os.environ[DATA_ENV] = path
+    for script in DASHBOARDS:
+        name = os.path.splitext(script)[0]
+        app = AppTest.from_file(os.path.abspath(script), default_timeout=args.app_timeout)
+        results[f'app/{name}/inicio'] = measure(app.run, 1)
+        radios = [radio for radio in app.radio if radio.key == 'section']
+        for number, option in enumerate(radios[0].options if radios else []):
+            def rerun(option=option):
+                app.radio(key='section').set_value(option).run()
+            results[f'app/{name}/seccion-{number + 1}'] = measure(rerun, args.repeat, clear_caches)
+        if app.exception:
+            raise RuntimeError(f'{script}: {app.exception[0].value}')
+
+
+def report(results, baseline=None, tolerance=0.2, min_delta_ms=5.0):
+    """Imprime la tabla de resultados; devuelve los casos que empeoraron."""
+    regressions = []
+    print(f'{"caso":<44} {"p50":>10} {"p95":>10} {"máx":>10} {"pico":>10}  vs. base')
+    for name, result in results.items():
+        line = (f'{name:<44} {result["p50_ms"]:7.1f} ms {result["p95_ms"]:7.1f} ms '
+                f'{result["max_ms"]:7.1f} ms {result["peak_mb"]:7.1f} MB')
+        base = (baseline or {}).get(name)
+        if base:
+            ratio = result['p50_ms'] / base['p50_ms'] if base['p50_ms'] else 1.0
+            slower = ratio > 1 + tolerance and result['p50_ms'] - base['p50_ms'] > min_delta_ms
+            heavier = result['peak_mb'] > base['peak_mb'] * (1 + tolerance) + 1
+            line += f'  x{ratio:5.2f}' + ('  ⚠️' if slower or heavier else '')
+            if slower or heavier:
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--load-repeat', type=int, default=1, help='repeticiones de la carga sin caché')
+    parser.add_argument('--data', help='CSV ya generado (si no, se genera uno temporal)')
+    parser.add_argument('--no-app', action='store_true', help='omitir la ejecución de los dashboards')
+    parser.add_argument('--app-timeout', type=float, default=600)
+    parser.add_argument('--save', help='guardar los resultados como línea base (JSON)')
+    parser.add_argument('--compare', help='línea base (JSON) contra la cual comparar')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='margen antes de marcar una regresión')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='diferencia mínima de p50 a marcar')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.data
+        if path is None:
+            path = os.path.join(directory, 'sintetico.csv')
+            start = time.perf_counter()
+            write_csv(path, args.rows, args.seed)
+            print(f'CSV sintético: {args.rows:,} filas en {time.perf_counter() - start:.1f} s')
+        results = {}
+        run_library(path, args, results)
+        if not args.no_app:
+            run_app(path, args, results)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    regressions = report(results, baseline, args.tolerance, args.min_delta_ms)
+    # ru_maxrss está en KB en Linux
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'RSS máximo del proceso: {max_rss_mb:.0f} MB')
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        meta = {
+            'rows': args.rows if args.data is None else None,
+            'data': args.data,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'cpus': os.cpu_count(),
+            'machine': platform.machine(),
+            'max_rss_mb': round(max_rss_mb, 1),
+        }
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f'Línea base guardada en {args.save}')
+    if regressions:
+        print(f'Regresiones: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Utilidades compartidas por los dashboards de cobertura móvil."""
+
+from cobertura.cube import CoverageCube
+from cobertura.dataset import Dataset
+from cobertura.filters import FILTER_COLUMNS, FilterEngine, RowView
+from cobertura.loader import (
+    CATEGORY_COLS,
+    COVERAGE_COLS,
+    DATA_PATH,
+    FLOAT_COLS,
+    INTEGER_DTYPES,
+    load_dataset,
+    normalize,
+    observed_counts,
+    read_csv,
+)
+from cobertura.memo import TTLCache, cache_stats, clear_caches, memoize
+from cobertura.metrics import (
+    MAIN_TECHNOLOGIES,
+    TECHNOLOGIES,
+    coverage_by,
+    coverage_counts,
+    mean_by,
+    to_tidy,
+)
+
+__all__ = [
+    'CATEGORY_COLS',
+    'COVERAGE_COLS',
+    'DATA_PATH',
+    'FILTER_COLUMNS',
+    'FLOAT_COLS',
+    'INTEGER_DTYPES',
+    'MAIN_TECHNOLOGIES',
+    'TECHNOLOGIES',
+    'CoverageCube',
+    'Dataset',
+    'FilterEngine',
+    'RowView',
+    'TTLCache',
+    'cache_stats',
+    'clear_caches',
+    'coverage_by',
+    'coverage_counts',
+    'load_dataset',
+    'mean_by',
+    'memoize',
+    'normalize',
+    'observed_counts',
+    'read_csv',
+    'to_tidy',
+]
@@ -0,0 +1,204 @@
+"""Datos de cada gráfico como funciones puras de (dataset, selección).
+
+Cada función recibe el `Dataset` y el diccionario de filtros de la barra
+lateral (`{columna: None | valor | lista}`) y devuelve la tabla que grafica el
+dashboard. Están memoizadas con `memo.memoize`: la clave es la versión de las
+particiones que toca la selección más la selección congelada, así que un
+rerun que no cambia los filtros (cambiar de pestaña, marcar una casilla) no
+recalcula nada, y agregar un trimestre solo invalida las selecciones que lo
+incluyen.
+
+Las consultas de cobertura, medias por grupo y mapa las resuelve
+`dataset.backend` (pandas sobre el cubo y las filas, o DuckDB sobre el Parquet
+de la ingesta); correlaciones y estadísticas descriptivas salen de los estados
+del cubo y el resto usa el cubo y las filas directamente.
+
+Los resultados se comparten entre sesiones y no deben modificarse en el lugar.
+"""
+
+import pandas as pd
+
+from cobertura import geo
+from cobertura.loader import observed_counts
+from cobertura.memo import memoize
+from cobertura.metrics import MAIN_TECHNOLOGIES, TECHNOLOGIES, coverage_by, coverage_counts
+
+# Columnas de las celdas del mapa por municipio o centro poblado
+LOCATION_COLUMNS = {
+    '4G': 'Cobertura_4G_%',
+    '5G': 'Cobertura_5G_%',
+    'registros': 'Registros',
+    'puntos': 'Localidades',
+    'aproximados': 'Ubicadas_por_nivel_superior',
+}
+
+# Filas por página de la tabla de datos filtrados
+PAGE_SIZE = 50
+
+MAP_COLUMNS = [
+    'Cobertura_4G_%',
+    'Cobertura_5G_%',
+    'Ingreso_Promedio',
+    'Tasa_Pobreza_%',
+    'Num_Municipios',
+    'Num_Proveedores',
+]
+
+
+@memoize()
+def overview(dataset, selection):
+    """Registros, departamentos, municipios y proveedores de la selección."""
+    cube = dataset.cube
+    return {
+        'registros': cube.count(where=selection),
+        'departamentos': cube.distinct('DEPARTAMENTO', where=selection),
+        'municipios': dataset.view(selection)['MUNICIPIO'].nunique(),
+        'proveedores': cube.distinct('NOMBRE_PROVEEDOR_COMERCIAL', where=selection),
+    }
+
+
+@memoize()
+def coverage_summary(dataset, selection, techs=tuple(TECHNOLOGIES)):
+    """Localidades con cobertura por tecnología."""
+    return dataset.backend.coverage_counts(selection, techs)
+
+
+@memoize()
+def coverage_rate(dataset, selection, columns):
+    """Porcentaje de localidades con cobertura en una o varias columnas COBERTURA_*."""
+    return dataset.cube.coverage(columns, where=selection)
+
+
+@memoize()
+def department_coverage(dataset, selection, limit=10):
+    """Heatmap de cobertura (%) de los primeros `limit` departamentos."""
+    departments = dataset.departments[:limit]
+    result = coverage_by(dataset.cube, 'DEPARTAMENTO', where=selection)
+    return result.reindex(departments, fill_value=0).rename_axis('Departamento')
+
+
+@memoize()
+def department_map(dataset, selection):
+    """Métricas por departamento con sus coordenadas para el mapa."""
+    map_data = dataset.backend.department_metrics(selection).round(2)
+    map_data.columns = MAP_COLUMNS
+    map_data = map_data.reset_index()
+    coords = geo.department_coordinates()
+    names = map_data['DEPARTAMENTO'].astype(str).map(geo.normalize_name)
+    map_data['lat'] = names.map(lambda name: coords.get(name, geo.COLOMBIA_CENTER)['lat'])
+    map_data['lon'] = names.map(lambda name: coords.get(name, geo.COLOMBIA_CENTER)['lon'])
+    return map_data
+
+
+@memoize()
+def location_bins(dataset, selection, level='COD_MUNICIPIO', zoom=6):
+    """Cobertura por municipio o centro poblado agregada en celdas del mapa.
+
+    Los puntos se ubican con las coordenadas DANE de `geo` y se agrupan en el
+    servidor: el mapa recibe como máximo `geo.MAX_BINS` celdas sin importar
+    cuántos códigos haya. `attrs['zoom']` es el zoom efectivo de las celdas.
+    """
+    points = dataset.backend.location_metrics(level, selection)
+    located = points.join(geo.resolve(points.index, level)).dropna(subset=['lat', 'lon'])
+    located = located.assign(aproximados=located.pop('ubicado_en') != geo.LEVELS[level])
+    bins = geo.grid_bins(located, zoom, counts=['aproximados'])
+    bins.columns = [LOCATION_COLUMNS.get(col, col) for col in bins.columns]
+    return bins
+
+
+@memoize()
+def value_counts(dataset, selection, column):
+    """Registros por valor de una columna, de mayor a menor."""
+    return observed_counts(dataset.view(selection)[column])
+
+
+@memoize()
+def top_departments(dataset, selection, column, limit=10):
+    """Departamentos con mayor promedio del indicador."""
+    means = dataset.cube.mean(column, by='DEPARTAMENTO', where=selection)
+    return means.sort_values(ascending=False).head(limit)
+
+
+@memoize()
+def provider_coverage(dataset, selection):
+    """Heatmap de cobertura (%) por proveedor."""
+    rates = dataset.backend.coverage_by('NOMBRE_PROVEEDOR_COMERCIAL', selection, MAIN_TECHNOLOGIES)
+    return rates.rename_axis('Proveedor')
+
+
+@memoize()
+def correlation(dataset, selection, columns):
+    """Matriz de correlación entre indicadores socioeconómicos.
+
+    Sale de los productos cruzados del cubo; solo si la selección tiene filas
+    con indicadores vacíos la calcula el motor de consultas sobre las filas.
+    """
+    matrix = dataset.cube.corr(columns, where=selection)
+    return dataset.backend.correlation(columns, selection) if matrix is None else matrix
+
+
+@memoize()
+def yearly_coverage(dataset, selection):
+    """Serie anual de cobertura (%) por tecnología en formato largo."""
+    tidy = dataset.backend.coverage_by('AÑO', selection, MAIN_TECHNOLOGIES, tidy=True)
+    return tidy.rename(columns={'AÑO': 'Año'})
+
+
+@memoize()
+def yearly_means(dataset, selection, columns):
+    """Serie anual de la media de cada indicador."""
+    return dataset.backend.mean_by('AÑO', columns, selection).reset_index()
+
+
+@memoize()
+def coverage_counts_by(dataset, selection, by, tech, limit=None):
+    """Localidades con cobertura de `tech` por grupo, solo grupos con alguna."""
+    counts = coverage_counts(dataset.cube, by, techs=[tech], where=selection)[tech]
+    counts = counts[counts > 0].sort_values(ascending=False)
+    return counts if limit is None else counts.head(limit)
+
+
+@memoize()
+def estrato_means(dataset, selection, columns):
+    """Media de los indicadores por estrato."""
+    return dataset.backend.mean_by('ESTRATO_PROMEDIO', columns, selection).round(2)
+
+
+@memoize()
+def describe(dataset, selection, columns):
+    """Estadísticas descriptivas de las columnas numéricas.
+
+    Desde el cubo (percentiles aproximados, ver `cobertura.sketch`) o, si el
+    cubo no tiene histogramas, recorriendo las filas.
+    """
+    summary = dataset.cube.describe(columns, where=selection)
+    return dataset.view(selection)[list(columns)].describe() if summary is None else summary
+
+
+@memoize()
+def table_page(dataset, selection, columns, sort=None, ascending=True, page=0, page_size=PAGE_SIZE):
+    """Una página de las filas de la selección y el total de filas.
+
+    El total sale del cubo y el motor materializa solo las filas de la página
+    con las columnas pedidas, así que el costo no depende del tamaño de la
+    selección (ordenar por una columna la recorre una vez). Las filas se
+    numeran desde 1 en el orden de la tabla.
+    """
+    total = dataset.cube.count(where=selection)
+    offset = min(page, max((total - 1) // page_size, 0)) * page_size
+    rows = dataset.backend.page(selection, list(columns), sort, ascending, offset, page_size)
+    rows = rows.set_axis(pd.RangeIndex(offset + 1, offset + 1 + len(rows)))
+    return rows, total
+
+
+@memoize()
+def summary_means(dataset, selection, columns):
+    """Media global de uno o varios indicadores en la selección."""
+    return dataset.cube.mean(columns, where=selection)
+
+
+@memoize()
+def department_ranking(dataset, selection, tech='4G'):
+    """Departamentos ordenados por cobertura (%) de una tecnología."""
+    rates = coverage_by(dataset.cube, 'DEPARTAMENTO', techs=[tech], where=selection)[tech]
+    return rates.sort_values(ascending=False)
@@ -0,0 +1,286 @@
+"""Motores de consulta intercambiables para las agregaciones del dashboard.
+
+Las funciones de `aggregates` piden consultas lógicas (cobertura por grupo,
+medias por grupo, métricas por departamento, correlaciones) y el motor decide
+cómo resolverlas (también la página visible de la tabla de filas, ordenada y
+con las columnas pedidas):
+
+- `PandasBackend`: el camino de siempre, sumando celdas del cubo cuando las
+  claves son dimensiones del cubo y recorriendo las filas en memoria si no.
+- `DuckDBBackend`: SQL en proceso con DuckDB sobre el Parquet de la ingesta
+  (particionado o archivo único) o, si no lo hay, sobre el DataFrame cargado.
+  Ejecuta las consultas vectorizadas, en varios núcleos y sin cargar el
+  Parquet completo en memoria.
+
+`COBERTURA_BACKEND` elige el motor: `pandas`, `duckdb` o `auto` (por defecto).
+`auto` usa pandas cuando las filas están en memoria, porque el cubo responde
+en milisegundos las consultas por dimensiones, y DuckDB (si está instalado)
+cuando el dataset es el Parquet particionado que no se carga completo
+(`benchmarks/bench_backends.py` compara ambos). Si se pide `duckdb` sin el
+paquete instalado, o un motor desconocido, se avisa en el log y se usa pandas
+(o `auto`) en lugar de fallar la carga. Los dos motores devuelven
+tablas con los mismos índices y columnas; DuckDB acumula las medias en
+float64, así que puede diferir de pandas en el último decimal.
+"""
+
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from cobertura import cache, parallel
+from cobertura.cube import DIMENSIONS
+from cobertura.memo import memoize
+from cobertura.metrics import TECHNOLOGIES, coverage_by, coverage_counts, mean_by, to_tidy
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - duckdb es opcional
+    duckdb = None
+
+BACKEND_ENV = 'COBERTURA_BACKEND'
+BACKENDS = ('auto', 'pandas', 'duckdb')
+
+# Métricas del mapa por departamento, en el orden de `aggregates.MAP_COLUMNS`
+logger = logging.getLogger(__name__)
+
+DEPARTMENT_METRICS = ['COBERTURA_4G', 'COBERTURA_5G', 'INGRESO_PROMEDIO_HOGAR', 'TASA_POBREZA',
+                      'MUNICIPIO', 'NOMBRE_PROVEEDOR_COMERCIAL']
+
+
+def _keys(by):
+    if by is None:
+        return []
+    return [by] if isinstance(by, str) else list(by)
+
+
+def _quote(col):
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _literal(path):
+    return "'" + path.replace("'", "''") + "'"
+
+
+def parquet_scan(source):
+    """`(read_parquet(...), manifiesto)` de la caché de la ingesta, o None si no aplica."""
+    manifest = None if source is None else cache.valid_manifest(source)
+    if manifest is None:
+        return None
+    directory = cache.partition_dir(source)
+    parquet_path = cache.cache_paths(source)[0]
+    if manifest.get('layout') == 'partitioned' and os.path.isdir(directory):
+        pattern = os.path.join(directory, '**', '*.parquet')
+        return f'read_parquet({_literal(pattern)}, hive_partitioning = true)', manifest
+    # Con trimestres agregados como segmentos las filas vigentes las resuelve `cache.read_rows`
+    if os.path.exists(parquet_path) and not manifest.get('segments'):
+        return f'read_parquet({_literal(parquet_path)})', manifest
+    return None
+
+
+@memoize(maxsize=8)
+def sort_order(dataset, selection, column, ascending=True):
+    """Posiciones de la selección ordenada por `column` (estable, vacíos al final).
+
+    Se guarda para que pasar de página no vuelva a ordenar la selección.
+    """
+    values = dataset.view(selection)[column].reset_index(drop=True)
+    return values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+
+class PandasBackend:
+    """Consultas sobre el cubo de agregados y las filas en memoria."""
+
+    name = 'pandas'
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def coverage_counts(self, selection, techs):
+        return coverage_counts(self.dataset.cube, techs=list(techs), where=selection)
+
+    def coverage_by(self, by, selection, techs, tidy=False):
+        return coverage_by(self.dataset.cube, by, techs=list(techs), where=selection, tidy=tidy)
+
+    def mean_by(self, by, columns, selection):
+        if all(key in DIMENSIONS for key in _keys(by)):
+            return mean_by(self.dataset.cube, by, list(columns), where=selection)
+        rows = self.dataset.view(selection)[[*_keys(by), *columns]]
+        blocks = parallel.row_blocks(rows)
+        if len(blocks) == 1:
+            return rows.groupby(by).mean()
+        # Suma y conteo por bloque en el pool; la media sale de los totales
+        parts = parallel.run(lambda block: block.groupby(by).agg(['sum', 'count']), blocks)
+        # Con varias claves el índice es un MultiIndex: se agrupa por todos sus niveles
+        totals = pd.concat(parts).groupby(level=list(range(len(_keys(by))))).sum()
+        return totals.xs('sum', axis=1, level=1) / totals.xs('count', axis=1, level=1)
+
+    def department_metrics(self, selection):
+        cube = self.dataset.cube
+        # Los municipios distintos no son aditivos: es la única métrica que recorre las filas
+        municipalities = self.dataset.view(selection)[['DEPARTAMENTO', 'MUNICIPIO']]
+        pairs = pd.concat(parallel.map_blocks(lambda block: block.drop_duplicates(), municipalities))
+        return pd.concat([
+            cube.coverage(['COBERTURA_4G', 'COBERTURA_5G'], by='DEPARTAMENTO', where=selection),
+            cube.mean(['INGRESO_PROMEDIO_HOGAR', 'TASA_POBREZA'], by='DEPARTAMENTO', where=selection),
+            pairs.groupby('DEPARTAMENTO', observed=True)['MUNICIPIO'].nunique(),
+            cube.distinct('NOMBRE_PROVEEDOR_COMERCIAL', by='DEPARTAMENTO', where=selection),
+        ], axis=1)
+
+    def correlation(self, columns, selection):
+        return self.dataset.view(selection)[list(columns)].corr()
+
+    def page(self, selection, columns, sort=None, ascending=True, offset=0, limit=50):
+        """Filas `offset`..`offset + limit` de la selección, con las columnas pedidas.
+
+        Solo esas filas se materializan; en el formato particionado se leen solo
+        los archivos y bloques que las contienen. Ordenar recorre una vez la
+        columna de orden de la selección (`sort_order`, memoizado).
+        """
+        rows = self.dataset.view(selection)
+        if sort is None:
+            indices = range(offset, min(offset + limit, len(rows)))
+        else:
+            indices = sort_order(self.dataset, selection, sort, ascending)[offset:offset + limit]
+        return rows.take(indices, columns)
+
+    def location_metrics(self, level, selection, techs=('4G', '5G')):
+        columns = [TECHNOLOGIES[tech] for tech in techs]
+        rows = self.dataset.view(selection)[[level, *columns]]
+        # Registros y localidades con cobertura por código, sumados por bloque en el pool
+        parts = parallel.map_blocks(
+            lambda block: block.groupby(level, observed=True)[columns].agg(['sum', 'count']), rows)
+        totals = pd.concat(parts).groupby(level=0).sum()
+        result = totals.xs('sum', axis=1, level=1) / totals.xs('count', axis=1, level=1) * 100
+        result.columns = list(techs)
+        result.insert(0, 'registros', totals[(columns[0], 'count')].astype('int64'))
+        return result
+
+
+class DuckDBBackend:
+    """Las mismas consultas en SQL sobre una conexión DuckDB en memoria.
+
+    La conexión se comparte entre sesiones de Streamlit; un candado serializa
+    las consultas (DuckDB ya paraleliza cada una internamente).
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, dataset, source=None, parquet=None):
+        if duckdb is None:
+            raise ImportError('El motor duckdb requiere el paquete duckdb (pip install duckdb)')
+        self.dataset = dataset
+        self._connection = duckdb.connect()
+        self._lock = threading.Lock()
+        # `parquet` consulta un archivo dado en lugar de la caché del CSV `source`
+        found = (f'read_parquet({_literal(parquet)})', {}) if parquet else parquet_scan(source)
+        if found is None:
+            if dataset.frame is None:
+                raise ValueError('No hay Parquet ni filas en memoria para consultar')
+            # DuckDB lee el DataFrame en su lugar, sin copiarlo
+            self._connection.register('filas_df', dataset.frame)
+            scan, self.manifest = 'filas_df', {}
+        else:
+            scan, self.manifest = found
+        self._connection.execute(f'CREATE VIEW filas AS SELECT * FROM {scan}')
+
+    def _where(self, selection):
+        """Cláusula WHERE y parámetros; COD_DEPARTAMENTO poda carpetas si existe."""
+        clauses, params = [], []
+        for col, _, values in cache.partition_filters(selection, self.manifest) or []:
+            clauses.append(f'{_quote(col)} IN ({", ".join("?" for _ in values)})')
+            params.extend(values)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _query(self, select, selection, by=()):
+        where, params = self._where(selection)
+        keys = ', '.join(_quote(key) for key in by)
+        group = f' GROUP BY {keys} ORDER BY {keys}' if by else ''
+        sql = f'SELECT {", ".join([*map(_quote, by), *select])} FROM filas{where}{group}'
+        with self._lock:
+            frame = self._connection.execute(sql, params).df()
+        return frame.set_index(list(by) if len(by) > 1 else by[0]) if by else frame
+
+    def coverage_counts(self, selection, techs):
+        select = [f'SUM(CAST({_quote(TECHNOLOGIES[tech])} AS BIGINT))' for tech in techs]
+        totals = self._query(select, selection).iloc[0]
+        return pd.Series(totals.fillna(0).to_numpy(dtype='int64'), index=list(techs))
+
+    def coverage_by(self, by, selection, techs, tidy=False):
+        keys = _keys(by)
+        select = [f'AVG(CAST({_quote(TECHNOLOGIES[tech])} AS DOUBLE)) * 100' for tech in techs]
+        result = self._query(select, selection, keys)
+        if not keys:
+            return pd.Series(result.iloc[0].to_numpy(), index=list(techs))
+        result.columns = list(techs)
+        return to_tidy(result, 'Tecnología', 'Cobertura_%') if tidy else result
+
+    def mean_by(self, by, columns, selection):
+        keys = _keys(by)
+        result = self._query([f'AVG({_quote(col)})' for col in columns], selection, keys)
+        if not keys:
+            return pd.Series(result.iloc[0].to_numpy(), index=list(columns))
+        result.columns = list(columns)
+        return result
+
+    def department_metrics(self, selection):
+        select = [
+            f'AVG(CAST({_quote("COBERTURA_4G")} AS DOUBLE)) * 100',
+            f'AVG(CAST({_quote("COBERTURA_5G")} AS DOUBLE)) * 100',
+            f'AVG({_quote("INGRESO_PROMEDIO_HOGAR")})',
+            f'AVG({_quote("TASA_POBREZA")})',
+            f'COUNT(DISTINCT {_quote("MUNICIPIO")})',
+            f'COUNT(DISTINCT {_quote("NOMBRE_PROVEEDOR_COMERCIAL")})',
+        ]
+        result = self._query(select, selection, ['DEPARTAMENTO'])
+        result.columns = DEPARTMENT_METRICS
+        return result
+
+    def location_metrics(self, level, selection, techs=('4G', '5G')):
+        select = ['COUNT(*)', *(f'AVG(CAST({_quote(TECHNOLOGIES[tech])} AS DOUBLE)) * 100' for tech in techs)]
+        result = self._query(select, selection, [level])
+        result.columns = ['registros', *techs]
+        result['registros'] = result['registros'].astype('int64')
+        return result
+
+    def page(self, selection, columns, sort=None, ascending=True, offset=0, limit=50):
+        """La página con LIMIT/OFFSET: DuckDB lee solo las columnas y filas pedidas."""
+        where, params = self._where(selection)
+        # Sin ORDER BY, DuckDB conserva el orden de lectura de las filas
+        order = '' if sort is None else f' ORDER BY {_quote(sort)} {"ASC" if ascending else "DESC"} NULLS LAST'
+        sql = f'SELECT {", ".join(map(_quote, columns))} FROM filas{where}{order} LIMIT ? OFFSET ?'
+        with self._lock:
+            return self._connection.execute(sql, [*params, int(limit), int(offset)]).df()
+
+    def correlation(self, columns, selection):
+        """Correlación de Pearson por pares en una sola pasada (`corr` de DuckDB)."""
+        columns = list(columns)
+        pairs = [(a, b) for i, a in enumerate(columns) for b in columns[i + 1:]]
+        values = self._query([f'CORR({_quote(a)}, {_quote(b)})' for a, b in pairs], selection).iloc[0]
+        matrix = pd.DataFrame(1.0, index=columns, columns=columns)
+        for (a, b), value in zip(pairs, values):
+            matrix.loc[a, b] = matrix.loc[b, a] = value
+        return matrix
+
+
+def backend_name():
+    """Motor pedido en `COBERTURA_BACKEND` (por defecto `auto`; también si el valor no es válido)."""
+    name = os.environ.get(BACKEND_ENV, 'auto').lower()
+    if name not in BACKENDS:
+        logger.warning('%s=%s no es un motor conocido (opciones: %s); se usa auto',
+                       BACKEND_ENV, name, ', '.join(BACKENDS))
+        return 'auto'
+    return name
+
+
+def create(dataset, source=None, name=None):
+    """Motor de consultas del dataset; pandas si DuckDB no está disponible."""
+    name = name or backend_name()
+    if name == 'duckdb' and duckdb is None:
+        logger.warning('%s=duckdb pero duckdb no está instalado (pip install -r requirements-bench.txt); '
+                       'se usa pandas', BACKEND_ENV)
+        return PandasBackend(dataset)
+    if name == 'pandas' or (name == 'auto' and (duckdb is None or dataset.frame is not None)):
+        return PandasBackend(dataset)
+    return DuckDBBackend(dataset, source)
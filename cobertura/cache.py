@@ -0,0 +1,469 @@
+"""Caché en disco del CSV convertido a Parquet.
+
+La primera carga convierte el CSV tipado a Parquet; las siguientes leen el
+archivo binario con memory map y solo las columnas pedidas. Cada archivo de
+caché lleva un manifiesto con el tamaño, la fecha de modificación y el hash
+SHA-256 del CSV de origen, de modo que cualquier cambio en el CSV lo invalida.
+
+La ingesta por bloques (`cobertura.ingest`) guarda además las celdas del cubo
+de agregados en `<nombre>.cube.parquet` (y sus histogramas de cuantiles en
+`<nombre>.sketch.parquet`), registrado en el mismo manifiesto.
+Los trimestres agregados después (`ingest.append`) se guardan como segmentos
+`<nombre>.append-<hash>.parquet`; un segmento sustituye en la lectura a las
+filas de sus particiones (AÑO, TRIMESTRE) que estén en archivos anteriores.
+
+Con el formato particionado de la ingesta las filas quedan en
+`<nombre>.parts/AÑO=.../TRIMESTRE=.../[COD_DEPARTAMENTO=...]`, y una lectura
+filtrada por año, trimestre o departamento solo abre esas carpetas.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow es opcional
+    pa = pc = ds = pq = None
+
+# Cambiar este número invalida todas las cachés escritas con un esquema anterior
+SCHEMA_VERSION = 1
+
+CACHE_DIR_ENV = 'COBERTURA_CACHE_DIR'
+PARTITION_COLS = ['AÑO', 'TRIMESTRE']
+DEPARTMENT_PARTITION = 'COD_DEPARTAMENTO'
+ROW_GROUP_SIZE = 1_000_000
+_HASH_BLOCK = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+def available():
+    """Indica si hay un motor Parquet instalado."""
+    return pq is not None
+
+
+def file_hash(path):
+    """SHA-256 del contenido del archivo, leído en bloques de 1 MB."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(_HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(path, with_hash=True):
+    """Huella del CSV de origen: tamaño, mtime y (opcionalmente) hash."""
+    stat = os.stat(path)
+    result = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'schema': SCHEMA_VERSION,
+    }
+    if with_hash:
+        result['sha256'] = file_hash(path)
+    return result
+
+
+def cache_paths(source, cache_dir=None):
+    """Rutas del Parquet y del manifiesto asociados a un CSV."""
+    source = os.path.abspath(source)
+    if cache_dir is None:
+        cache_dir = os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.dirname(source), '.cache')
+    stem = os.path.splitext(os.path.basename(source))[0]
+    base = os.path.join(cache_dir, stem)
+    return base + '.parquet', base + '.json'
+
+
+def cube_path(source, cache_dir=None):
+    """Ruta del Parquet con las celdas del cubo de agregados de un CSV."""
+    parquet_path = cache_paths(source, cache_dir)[0]
+    return parquet_path[:-len('.parquet')] + '.cube.parquet'
+
+
+def precomputed_path(source, cache_dir=None):
+    """Ruta de los resultados precalculados de las vistas frecuentes (ver `cobertura.precompute`)."""
+    parquet_path = cache_paths(source, cache_dir)[0]
+    return parquet_path[:-len('.parquet')] + '.precomputed.pkl'
+
+
+def sketch_path(source, cache_dir=None):
+    """Ruta del Parquet con los histogramas de cuantiles del cubo (ver `cobertura.sketch`)."""
+    parquet_path = cache_paths(source, cache_dir)[0]
+    return parquet_path[:-len('.parquet')] + '.sketch.parquet'
+
+
+def partition_dir(source, cache_dir=None):
+    """Carpeta con las filas particionadas (formato hive) de un CSV."""
+    parquet_path = cache_paths(source, cache_dir)[0]
+    return parquet_path[:-len('.parquet')] + '.parts'
+
+
+def shared_path(source, cache_dir=None):
+    """Archivo Arrow con las filas normalizadas, mapeado por todos los procesos."""
+    parquet_path = cache_paths(source, cache_dir)[0]
+    return parquet_path[:-len('.parquet')] + '.arrow'
+
+
+def segment_path(source, digest, cache_dir=None):
+    """Ruta del segmento Parquet de un trimestre agregado, por hash de su CSV."""
+    parquet_path = cache_paths(source, cache_dir)[0]
+    return f"{parquet_path[:-len('.parquet')]}.append-{digest[:12]}.parquet"
+
+
+def _prune_segments(source, cache_dir=None, keep=()):
+    """Borra los segmentos que el manifiesto ya no referencia."""
+    pattern = segment_path(source, '*', cache_dir)
+    for path in glob.glob(pattern):
+        if os.path.basename(path) not in keep:
+            os.remove(path)
+
+
+def _read_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(path, manifest):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=2)
+    os.replace(tmp, path)
+
+
+def valid_manifest(source, cache_dir=None):
+    """Devuelve el manifiesto si sigue siendo válido para el CSV, o None.
+
+    Si el tamaño y el mtime coinciden se confía en la caché sin releer el CSV.
+    Si solo cambió el mtime (copia, checkout) se compara el hash del contenido.
+    """
+    manifest_path = cache_paths(source, cache_dir)[1]
+    manifest = _read_manifest(manifest_path)
+    if manifest is None:
+        return None
+    current = fingerprint(source, with_hash=False)
+    if manifest.get('schema') != current['schema'] or manifest.get('size') != current['size']:
+        return None
+    if manifest.get('mtime_ns') != current['mtime_ns']:
+        if manifest.get('sha256') != file_hash(source):
+            return None
+        manifest['mtime_ns'] = current['mtime_ns']
+        _write_manifest(manifest_path, manifest)
+    return manifest
+
+
+def lookup(source, cache_dir=None):
+    """Devuelve la ruta del Parquet si sigue siendo válido para el CSV, o None."""
+    parquet_path = cache_paths(source, cache_dir)[0]
+    if not os.path.exists(parquet_path) or valid_manifest(source, cache_dir) is None:
+        return None
+    return parquet_path
+
+
+def store(frame, source, cache_dir=None):
+    """Escribe el DataFrame tipado como Parquet y registra su manifiesto.
+
+    Si el manifiesto vigente es de una ingesta de este mismo CSV (p. ej. con
+    `--no-rows`), se conservan su cubo y sus particiones: las filas se agregan
+    junto a ellos en lugar de reemplazarlos.
+    """
+    parquet_path, manifest_path = cache_paths(source, cache_dir)
+    previous = valid_manifest(source, cache_dir) or {}
+    directory = partition_dir(source, cache_dir)
+    if previous.get('layout') == 'partitioned' and os.path.isdir(directory):
+        logger.warning('%s ya tiene filas particionadas; no se reemplazan', source)
+        return directory
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    tmp = parquet_path + '.tmp'
+    frame.to_parquet(tmp, engine='pyarrow', index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp, parquet_path)
+    manifest = fingerprint(source)
+    manifest['rows'] = len(frame)
+    if previous.get('cube'):
+        manifest.update(cube=True, columns=previous.get('columns') or list(frame.columns))
+    _write_manifest(manifest_path, manifest)
+    _prune_segments(source, cache_dir)
+    shutil.rmtree(directory, ignore_errors=True)
+    return parquet_path
+
+
+def write_manifest(source, cache_dir=None, **extra):
+    """Registra el manifiesto del CSV una vez escritos sus archivos de caché."""
+    manifest = fingerprint(source)
+    manifest.update(extra)
+    _write_manifest(cache_paths(source, cache_dir)[1], manifest)
+    _prune_segments(source, cache_dir)
+    return manifest
+
+
+def save_manifest(source, manifest, cache_dir=None):
+    """Reescribe un manifiesto ya validado (sin volver a calcular el hash del CSV)."""
+    _write_manifest(cache_paths(source, cache_dir)[1], manifest)
+
+
+def store_cube(cells, source, cache_dir=None, sketches=None):
+    """Escribe las celdas del cubo y sus histogramas; el manifiesto se registra aparte."""
+    path = cube_path(source, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    cells.to_parquet(tmp, engine='pyarrow', index=False)
+    os.replace(tmp, path)
+    histogram_path = sketch_path(source, cache_dir)
+    if sketches is None:
+        # Unos histogramas de una versión anterior del cubo ya no le corresponden
+        if os.path.exists(histogram_path):
+            os.remove(histogram_path)
+    else:
+        sketches.to_parquet(histogram_path + '.tmp', engine='pyarrow', index=False)
+        os.replace(histogram_path + '.tmp', histogram_path)
+    return path
+
+
+def read_cube(source, cache_dir=None):
+    """Celdas del cubo guardadas por la ingesta, o None si no son válidas."""
+    if not available():
+        return None
+    path = cube_path(source, cache_dir)
+    if not os.path.exists(path):
+        return None
+    manifest = valid_manifest(source, cache_dir)
+    if manifest is None or not manifest.get('cube'):
+        return None
+    return pq.read_table(path, memory_map=True).to_pandas()
+
+
+def read_sketches(source, cache_dir=None):
+    """Histogramas de cuantiles guardados junto al cubo, o None si no hay."""
+    if not available():
+        return None
+    path = sketch_path(source, cache_dir)
+    if not os.path.exists(path):
+        return None
+    manifest = valid_manifest(source, cache_dir)
+    if manifest is None or not manifest.get('cube'):
+        return None
+    return pq.read_table(path, memory_map=True).to_pandas()
+
+
+def read(parquet_path, columns=None):
+    """Lee el Parquet con memory map, limitado a las columnas pedidas."""
+    table = pq.read_table(parquet_path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+def _partition_keys(table):
+    return pc.add(pc.multiply(pc.cast(table['AÑO'], pa.int32()), 10), pc.cast(table['TRIMESTRE'], pa.int32()))
+
+
+def _as_values(value):
+    return [value] if isinstance(value, str) or not hasattr(value, '__iter__') else list(value)
+
+
+def partition_filters(where, manifest):
+    """Filtros de pyarrow para `{columna: valor o lista}`.
+
+    Los de AÑO y TRIMESTRE (y COD_DEPARTAMENTO, traducido desde el nombre del
+    departamento) descartan carpetas enteras; el resto se aplica por fila.
+    """
+    filters = []
+    for col, value in (where or {}).items():
+        if value is None:
+            continue
+        values = _as_values(value)
+        filters.append((col, 'in', [v.item() if hasattr(v, 'item') else v for v in values]))
+        codes = manifest.get('department_codes')
+        if col == 'DEPARTAMENTO' and codes:
+            selected = sorted({code for name in values for code in codes.get(name, [])})
+            filters.append((DEPARTMENT_PARTITION, 'in', selected))
+    return filters or None
+
+
+def read_partitions(source, where=None, columns=None, cache_dir=None):
+    """Filas del formato particionado que cumplen `where`, o None si no aplica."""
+    manifest = valid_manifest(source, cache_dir)
+    directory = partition_dir(source, cache_dir)
+    if manifest is None or manifest.get('layout') != 'partitioned' or not os.path.isdir(directory):
+        return None
+    table = pq.read_table(directory, columns=columns, filters=partition_filters(where, manifest),
+                          partitioning='hive', memory_map=True)
+    frame = table.to_pandas()
+    # Las columnas de partición se leen al final: se restituye el orden original
+    order = manifest.get('columns')
+    if order and columns is None:
+        frame = frame[[col for col in order if col in frame.columns]]
+    return frame
+
+
+def _partition_dataset(source, where, cache_dir=None):
+    """Dataset de pyarrow de las filas particionadas y la expresión de `where`."""
+    manifest = valid_manifest(source, cache_dir)
+    directory = partition_dir(source, cache_dir)
+    if manifest is None or manifest.get('layout') != 'partitioned' or not os.path.isdir(directory):
+        raise ValueError(f'No hay filas particionadas de {source}')
+    dataset = ds.dataset(directory, format='parquet', partitioning='hive')
+    filters = partition_filters(where, manifest)
+    return dataset, None if filters is None else pq.filters_to_expression(filters)
+
+
+def partition_groups(source, where=None, cache_dir=None):
+    """`[(claves, archivos)]` de cada carpeta de la selección, en el orden de `read_partitions`.
+
+    `claves` son los valores de partición de la carpeta (`{'AÑO': 2020,
+    'TRIMESTRE': 1}`); solo se listan los archivos, sin abrirlos.
+    """
+    dataset, expression = _partition_dataset(source, where, cache_dir)
+    groups = []
+    for fragment in dataset.get_fragments(filter=expression):
+        folder = os.path.dirname(fragment.path)
+        if groups and groups[-1][0] == folder:
+            groups[-1][2].append(fragment.path)
+        else:
+            groups.append((folder, ds.get_partition_keys(fragment.partition_expression), [fragment.path]))
+    return [(keys, paths) for _, keys, paths in groups]
+
+
+def take_partitions(source, positions, where=None, columns=None, counts=None, cache_dir=None):
+    """Filas de la selección en `positions` (en el orden de `read_partitions`).
+
+    `counts` trae las filas de la selección en cada carpeta de
+    `partition_groups` (p. ej. del cubo): las carpetas sin ninguna de las
+    posiciones se saltan sin abrirlas. Dentro de las demás se cuentan los
+    archivos, se saltan los bloques anteriores y se deja de leer después de la
+    última posición, así que una página cuesta lo mismo al principio que al
+    final de una selección grande. Sin `counts` se cuentan todos los archivos.
+    """
+    dataset, expression = _partition_dataset(source, where, cache_dir)
+    schema = dataset.schema
+    columns = list(columns or schema.names)
+    positions = np.asarray(positions, dtype='int64')
+    fragments = {fragment.path: fragment for fragment in dataset.get_fragments(filter=expression)}
+
+    def count(path):
+        # El esquema del dataset incluye las columnas de partición, que no están en cada archivo
+        return fragments[path].scanner(schema=schema, filter=expression).count_rows()
+
+    groups = partition_groups(source, where, cache_dir)
+    if counts is None:
+        groups = [(None, [path]) for _, paths in groups for path in paths]
+        counts = [count(path) for _, (path,) in groups]
+    found, tables = [], []
+    start = 0
+    for (_, paths), total in zip(groups, counts):
+        if not np.any((positions >= start) & (positions < start + total)):
+            start += total
+            continue
+        for path in paths:
+            rows = total if len(paths) == 1 else count(path)
+            local = np.sort(positions[(positions >= start) & (positions < start + rows)]) - start
+            first = 0
+            batches = fragments[path].to_batches(schema=schema, columns=columns, filter=expression)
+            for batch in batches if len(local) else ():
+                hits = local[(local >= first) & (local < first + batch.num_rows)]
+                if len(hits):
+                    tables.append(pa.Table.from_batches([batch.take(pa.array(hits - first))]))
+                    found.append(hits + start)
+                first += batch.num_rows
+                if first > local[-1]:
+                    break
+            start += rows
+    if not tables:
+        return schema.empty_table().select(columns).to_pandas()
+    frame = pa.concat_tables(tables).to_pandas()
+    # Las filas vuelven al orden de `positions`
+    return frame.take(pd.Index(np.concatenate(found)).get_indexer(positions)).reset_index(drop=True)
+
+
+def iter_partitions(source, where=None, columns=None, batch_rows=ROW_GROUP_SIZE, cache_dir=None):
+    """Bloques de hasta `batch_rows` filas del formato particionado que cumplen `where`.
+
+    Lee un bloque a la vez, así que recorrer una selección grande no la carga
+    completa en memoria. Siempre entrega al menos un bloque (vacío si no hay filas).
+    """
+    manifest = valid_manifest(source, cache_dir)
+    directory = partition_dir(source, cache_dir)
+    if manifest is None or manifest.get('layout') != 'partitioned' or not os.path.isdir(directory):
+        raise ValueError(f'No hay filas particionadas de {source}')
+    dataset = ds.dataset(directory, format='parquet', partitioning='hive')
+    filters = partition_filters(where, manifest)
+    scanner = dataset.scanner(
+        columns=list(columns or manifest.get('columns') or dataset.schema.names),
+        filter=None if filters is None else pq.filters_to_expression(filters),
+        batch_size=batch_rows,
+    )
+    empty = True
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            empty = False
+            yield batch.to_pandas()
+    if empty:
+        yield scanner.projected_schema.empty_table().to_pandas()
+
+
+def read_rows(source, columns=None, cache_dir=None):
+    """Filas de la caché (archivo base más segmentos), o None si no es válida.
+
+    Las particiones de cada segmento reemplazan a las mismas particiones en el
+    archivo base y en los segmentos anteriores.
+    """
+    parquet_path = cache_paths(source, cache_dir)[0]
+    manifest = valid_manifest(source, cache_dir)
+    if manifest is not None and manifest.get('layout') == 'partitioned':
+        return read_partitions(source, columns=columns, cache_dir=cache_dir)
+    if manifest is None or not os.path.exists(parquet_path):
+        return None
+    segments = manifest.get('segments', [])
+    if not segments:
+        return read(parquet_path, columns)
+    directory = os.path.dirname(parquet_path)
+    files = [(parquet_path, None)] + [
+        (os.path.join(directory, segment['file']), segment['partitions']) for segment in segments
+    ]
+    read_columns = None if columns is None else list(dict.fromkeys([*columns, 'AÑO', 'TRIMESTRE']))
+    tables = []
+    for position, (path, _) in enumerate(files):
+        table = pq.read_table(path, columns=read_columns, memory_map=True)
+        superseded = {year * 10 + quarter for _, later in files[position + 1:] for year, quarter in later}
+        if superseded:
+            mask = pc.invert(pc.is_in(_partition_keys(table), value_set=pa.array(sorted(superseded), pa.int32())))
+            table = table.filter(mask)
+        tables.append(table if columns is None else table.select(list(columns)))
+    return pa.concat_tables(tables, promote_options='permissive').to_pandas()
+
+
+def source_version(source, cache_dir=None):
+    """Versión de los datos: hash del CSV, combinado con los segmentos agregados.
+
+    Usa el hash del manifiesto si la caché es válida; si no, lo calcula.
+    """
+    manifest = valid_manifest(source, cache_dir)
+    if manifest and manifest.get('version'):
+        return manifest['version']
+    if manifest and manifest.get('sha256'):
+        return manifest['sha256']
+    return file_hash(source)
+
+
+def version_token(source, cache_dir=None):
+    """Identificador barato de la versión actual, para invalidar cachés en memoria.
+
+    Solo consulta tamaño, mtime y el manifiesto: cambia cuando cambia el CSV o
+    cuando se agrega un trimestre, sin leer el contenido del CSV.
+    """
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+    manifest = valid_manifest(source, cache_dir) or {}
+    return (stat.st_size, stat.st_mtime_ns, manifest.get('version'))
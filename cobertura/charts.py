@@ -0,0 +1,204 @@
+"""Figuras de Plotly construidas una sola vez por (datos, parámetros).
+
+Construir una figura con `plotly.express` cuesta decenas de milisegundos,
+mucho más que serializarla. Cada constructor está memoizado: la clave es el
+hash del contenido del agregado más los parámetros del gráfico, de modo que
+un gráfico cuyos datos no cambiaron se vuelve a enviar sin reconstruirlo.
+
+`st.plotly_chart` no modifica la figura que recibe, por lo que la misma
+instancia se puede compartir entre sesiones.
+"""
+
+import os
+
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from cobertura.memo import memoize
+
+FIGURE_CACHE_SIZE = 128
+
+# Etiquetas de las variables del mapa por departamento
+MAP_LABELS = {
+    'Cobertura_4G_%': '📡 Cobertura 4G (%)',
+    'Cobertura_5G_%': '🚀 Cobertura 5G (%)',
+    'Ingreso_Promedio': '💰 Ingreso Promedio',
+    'Tasa_Pobreza_%': '📊 Tasa de Pobreza (%)',
+    'Num_Municipios': '🏘️ Número de Municipios',
+    'Num_Proveedores': '📡 Número de Proveedores',
+}
+
+# Centro del mapa (Colombia)
+MAP_CENTER = {"lat": 4.5709, "lon": -74.2973}
+
+# Fondo de los mapas; `white-bg` no descarga teselas y funciona sin conexión
+MAP_STYLE_ENV = 'COBERTURA_MAP_STYLE'
+MAP_STYLE = os.environ.get(MAP_STYLE_ENV, 'open-street-map')
+
+# Etiquetas de las variables del mapa por municipio o centro poblado
+LOCATION_LABELS = {
+    'Cobertura_4G_%': '📡 Cobertura 4G (%)',
+    'Cobertura_5G_%': '🚀 Cobertura 5G (%)',
+    'Registros': '📊 Registros',
+}
+
+
+@memoize(maxsize=FIGURE_CACHE_SIZE)
+def bar(values, title, x_label, y_label, color_scale, height=400, tickangle=None):
+    """Barras verticales de una Series, coloreadas por su valor."""
+    fig = px.bar(
+        x=values.index,
+        y=values.values,
+        title=title,
+        labels={'x': x_label, 'y': y_label},
+        color=values.values,
+        color_continuous_scale=color_scale
+    )
+    if tickangle is not None:
+        fig.update_layout(xaxis_tickangle=tickangle)
+    fig.update_layout(height=height)
+    return fig
+
+
+@memoize(maxsize=FIGURE_CACHE_SIZE)
+def hbar(values, title, x_label, y_label, color_scale, height=350):
+    """Barras horizontales de una Series, coloreadas por su valor."""
+    fig = px.bar(
+        x=values.values,
+        y=values.index,
+        orientation='h',
+        title=title,
+        labels={'x': x_label, 'y': y_label},
+        color=values.values,
+        color_continuous_scale=color_scale
+    )
+    fig.update_layout(height=height)
+    return fig
+
+
+@memoize(maxsize=FIGURE_CACHE_SIZE)
+def pie(values, title, height=400, color_map=None, color_sequence=None):
+    """Gráfico de torta de una Series; `color_sequence` puede ser el nombre de una escala secuencial de Plotly."""
+    if isinstance(color_sequence, str):
+        color_sequence = getattr(px.colors.sequential, color_sequence)
+    fig = px.pie(
+        values=values.values,
+        names=values.index,
+        title=title,
+        color_discrete_map=color_map,
+        color_discrete_sequence=color_sequence
+    )
+    fig.update_layout(height=height)
+    return fig
+
+
+@memoize(maxsize=FIGURE_CACHE_SIZE)
+def heatmap(frame, title, color_scale, height=400, zmin=None, zmax=None):
+    """Mapa de calor de un DataFrame."""
+    fig = px.imshow(
+        frame,
+        title=title,
+        color_continuous_scale=color_scale,
+        aspect="auto",
+        zmin=zmin, zmax=zmax
+    )
+    fig.update_layout(height=height)
+    return fig
+
+
+@memoize(maxsize=FIGURE_CACHE_SIZE)
+def line(frame, x, y, color, title, labels, height=400):
+    """Líneas con marcadores, una por valor de `color`."""
+    fig = px.line(
+        frame,
+        x=x,
+        y=y,
+        color=color,
+        title=title,
+        labels=labels,
+        markers=True
+    )
+    fig.update_layout(height=height)
+    return fig
+
+
+@memoize(maxsize=FIGURE_CACHE_SIZE)
+def small_multiples(frame, x, columns, titles, names, rows, cols, kind='line', height=400, title=None):
+    """Un panel por columna de `frame`; `x=None` usa el índice como eje X."""
+    fig = make_subplots(
+        rows=rows, cols=cols,
+        subplot_titles=titles,
+        specs=[[{"secondary_y": False} for _ in range(cols)] for _ in range(rows)]
+    )
+    x_values = frame.index if x is None else frame[x]
+    trace = go.Scatter if kind == 'line' else go.Bar
+    for i, (column, name) in enumerate(zip(columns, names)):
+        fig.add_trace(trace(x=x_values, y=frame[column], name=name), row=i // cols + 1, col=i % cols + 1)
+    fig.update_layout(height=height, showlegend=False, title_text=title)
+    return fig
+
+
+@memoize(maxsize=FIGURE_CACHE_SIZE)
+def department_map(map_data, variable):
+    """Mapa de puntos por departamento coloreado (y dimensionado) por `variable`."""
+    fig = px.scatter_map(
+        map_data,
+        lat='lat',
+        lon='lon',
+        size=variable if variable in ['Num_Municipios', 'Num_Proveedores'] else None,
+        color=variable,
+        hover_name='DEPARTAMENTO',
+        hover_data={
+            'Cobertura_4G_%': ':.1f',
+            'Cobertura_5G_%': ':.1f',
+            'Ingreso_Promedio': ':,.0f',
+            'Tasa_Pobreza_%': ':.1f',
+            'Num_Municipios': ':.0f',
+            'Num_Proveedores': ':.0f',
+            'lat': False,
+            'lon': False
+        },
+        title=f"🗺️ {MAP_LABELS[variable]} por Departamento",
+        color_continuous_scale='RdYlGn' if 'Cobertura' in variable else 'Blues',
+        size_max=50,
+        zoom=4,
+        center=MAP_CENTER
+    )
+    fig.update_layout(
+        map_style=MAP_STYLE,
+        height=600,
+        margin={"r": 0, "t": 50, "l": 0, "b": 0}
+    )
+    return fig
+
+
+@memoize(maxsize=FIGURE_CACHE_SIZE)
+def location_map(bins, variable, zoom, title):
+    """Celdas de `aggregates.location_bins`, dimensionadas por registros y coloreadas por `variable`."""
+    fig = px.scatter_map(
+        bins,
+        lat='lat',
+        lon='lon',
+        size='Registros',
+        color=variable,
+        hover_data={
+            'Localidades': ':,.0f',
+            'Registros': ':,.0f',
+            'Cobertura_4G_%': ':.1f',
+            'Cobertura_5G_%': ':.1f',
+            'lat': False,
+            'lon': False
+        },
+        title=title,
+        color_continuous_scale='RdYlGn' if 'Cobertura' in variable else 'Blues',
+        size_max=30,
+        zoom=zoom,
+        center=MAP_CENTER
+    )
+    fig.update_layout(
+        map_style=MAP_STYLE,
+        height=600,
+        margin={"r": 0, "t": 50, "l": 0, "b": 0}
+    )
+    return fig
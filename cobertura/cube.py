@@ -0,0 +1,334 @@
+"""Cubo de agregados AÑO × TRIMESTRE × DEPARTAMENTO × PROVEEDOR.
+
+Se construye una sola vez al cargar los datos. Cada celda guarda estados
+aditivos (número de registros, localidades con cobertura por tecnología y
+conteo, suma, suma de cuadrados y productos cruzados de los indicadores),
+así que cualquier combinación de filtros sobre las dimensiones se responde
+sumando celdas en lugar de recorrer las filas originales. También guarda el
+mínimo y el máximo de cada indicador y, aparte, un histograma logarítmico por
+celda (`cobertura.sketch`) para los cuantiles: con eso salen `describe()` y
+las matrices de correlación de cualquier selección.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cobertura import parallel, profiling, sketch
+from cobertura.loader import COVERAGE_COLS
+
+DIMENSIONS = ['AÑO', 'TRIMESTRE', 'DEPARTAMENTO', 'NOMBRE_PROVEEDOR_COMERCIAL']
+
+# Indicadores numéricos con media y desviación disponibles en el cubo
+MEASURES = [
+    'ESTRATO_PROMEDIO',
+    'INGRESO_PROMEDIO_HOGAR',
+    'TASA_POBREZA',
+    'INDICE_NBI',
+    'TASA_DESEMPLEO',
+    'TASA_ELECTRIFICACION',
+    'PCT_HOGARES_INTERNET',
+    'ALTITUD_MSNM',
+    'PRECIPITACION_MEDIA',
+    'INV_PUBLICA_PER_CAPITA',
+]
+
+COUNT = 'REGISTROS'
+
+# Filas con algún indicador vacío; sin ellas en la selección la correlación sale del cubo
+INCOMPLETE = 'MEDIDAS_INCOMPLETAS'
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str) or np.isscalar(value):
+        return [value]
+    return list(value)
+
+
+def _n(col):
+    return f'{col}__n'
+
+
+def _sum(col):
+    return f'{col}__sum'
+
+
+def _sumsq(col):
+    return f'{col}__sumsq'
+
+
+def _cross(a, b):
+    first, second = sorted((a, b), key=MEASURES.index)
+    return f'{first}__x__{second}'
+
+
+def _min(col):
+    return f'{col}__min'
+
+
+def _max(col):
+    return f'{col}__max'
+
+
+def _pairs(columns):
+    return [(a, b) for i, a in enumerate(columns) for b in columns[i + 1:]]
+
+
+def _is_extreme(col):
+    return col.endswith(('__min', '__max'))
+
+
+class CoverageCube:
+    """Estados aditivos por celda de las cuatro dimensiones del dashboard."""
+
+    def __init__(self, cells, sketches=None):
+        self.cells = cells
+        # Histogramas por celda para cuantiles (ver `cobertura.sketch`); None en cubos sin ellos
+        self.sketches = sketches
+
+    @classmethod
+    def from_frame(cls, df):
+        """Construye el cubo con una sola pasada de agrupación sobre las filas."""
+        grouped = df.groupby(DIMENSIONS, observed=True, dropna=False, sort=True)
+        codes = grouped.ngroup().to_numpy()
+        cells = grouped.size().rename(COUNT).reset_index()
+        size = len(cells)
+        # Estados en un diccionario y una sola concatenación: son más de cien columnas
+        state = {}
+
+        for col in COVERAGE_COLS:
+            if col in df.columns:
+                hits = np.bincount(codes, weights=df[col].to_numpy(), minlength=size)
+                state[col] = hits.astype('int64')
+
+        measures = [col for col in MEASURES if col in df.columns]
+        filled = {}
+        incomplete = np.zeros(len(df), dtype=bool)
+        for col in measures:
+            # Los enteros anulables (Int16, ...) pasan sus vacíos como NaN
+            values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+            valid = ~np.isnan(values)
+            incomplete |= ~valid
+            filled[col] = np.where(valid, values, 0.0)
+            state[_n(col)] = np.bincount(codes, weights=valid, minlength=size).astype('int64')
+            state[_sum(col)] = np.bincount(codes, weights=filled[col], minlength=size)
+            state[_sumsq(col)] = np.bincount(codes, weights=filled[col] * filled[col], minlength=size)
+
+        if measures:
+            extremes = grouped[measures].agg(['min', 'max'])
+            for col in measures:
+                state[_min(col)] = extremes[(col, 'min')].to_numpy(dtype='float64', na_value=np.nan)
+                state[_max(col)] = extremes[(col, 'max')].to_numpy(dtype='float64', na_value=np.nan)
+            # Los vacíos suman 0 al producto; solo se usa en selecciones sin filas incompletas
+            for a, b in _pairs(measures):
+                state[_cross(a, b)] = np.bincount(codes, weights=filled[a] * filled[b], minlength=size)
+            state[INCOMPLETE] = np.bincount(codes, weights=incomplete, minlength=size).astype('int64')
+
+        cells = pd.concat([cells, pd.DataFrame(state)], axis=1)
+        sketches = sketch.build(codes, {col: df[col].to_numpy(dtype='float64', na_value=np.nan) for col in measures},
+                                cells[DIMENSIONS])
+        return cls(cells, sketches)
+
+    @classmethod
+    def build(cls, df):
+        """Como `from_frame`, con un cubo parcial por bloque de filas en el pool compartido."""
+        parts = parallel.map_blocks(cls.from_frame, df)
+        return parts[0] if len(parts) == 1 else parts[0].merge(*parts[1:])
+
+    def merge(self, *others):
+        """Combina cubos (por ejemplo, de bloques distintos del CSV)."""
+        cubes = [self, *others]
+        cells = pd.concat([cube.cells for cube in cubes], ignore_index=True)
+        for dim in DIMENSIONS:
+            if cells[dim].dtype == object or isinstance(cells[dim].dtype, pd.StringDtype):
+                cells[dim] = cells[dim].astype('category')
+        state = [col for col in cells.columns if col not in DIMENSIONS]
+        grouped = cells.groupby(DIMENSIONS, observed=True, dropna=False, sort=True)
+        additive = [col for col in state if not _is_extreme(col)]
+        lows = [col for col in state if col.endswith('__min')]
+        highs = [col for col in state if col.endswith('__max')]
+        merged = pd.concat([grouped[additive].sum(), grouped[lows].min(), grouped[highs].max()], axis=1)
+        sketches = None
+        if all(cube.sketches is not None for cube in cubes):
+            sketches = sketch.merge([cube.sketches for cube in cubes], DIMENSIONS)
+        return CoverageCube(merged[state].reset_index(), sketches)
+
+    def replace(self, other, keys=('AÑO', 'TRIMESTRE')):
+        """Sustituye las particiones `keys` presentes en `other` por sus celdas.
+
+        Sirve para agregar o corregir un trimestre sin recalcular el resto.
+        """
+        keys = list(keys)
+        incoming = pd.MultiIndex.from_frame(other.cells[keys]).unique()
+
+        def kept(frame):
+            return frame[~pd.MultiIndex.from_frame(frame[keys]).isin(incoming)].reset_index(drop=True)
+
+        sketches = None if self.sketches is None else kept(self.sketches)
+        return CoverageCube(kept(self.cells), sketches).merge(other)
+
+    def select(self, where=None):
+        """Celdas que cumplen los filtros `{dimensión: valor o lista de valores}`.
+
+        Un valor `None` en el diccionario significa "sin filtro" para esa dimensión.
+        """
+        profiling.add_rows(len(self.cells))
+        return _filter(self.cells, where)
+
+    def rollup(self, by=None, where=None, columns=None):
+        """Suma los estados de las celdas seleccionadas agrupando por `by`.
+
+        `columns` limita la suma a esos estados (por defecto, todos los
+        aditivos). Sin `by` devuelve una Serie con el total de la selección.
+        """
+        cells = self.select(where)
+        if columns is None:
+            state = [col for col in cells.columns if col not in DIMENSIONS and not _is_extreme(col)]
+        else:
+            state = list(dict.fromkeys(columns))
+        keys = _as_list(by)
+        if not keys:
+            return cells[state].sum()
+        return cells.groupby(keys if len(keys) > 1 else keys[0], observed=True)[state].sum()
+
+    def count(self, by=None, where=None):
+        """Número de registros de la selección."""
+        counts = self.rollup(by, where, [COUNT])[COUNT]
+        if np.isscalar(counts):
+            return int(counts)
+        return counts.astype('int64')
+
+    def coverage(self, techs, by=None, where=None):
+        """Porcentaje de registros con cobertura para cada tecnología."""
+        state = self.rollup(by, where, [COUNT, *_as_list(techs)])
+        result = _select_columns(state, techs) / _count(state) * 100
+        return _unwrap(result, techs)
+
+    def mean(self, columns, by=None, where=None):
+        """Media de los indicadores, igual a `groupby(...).mean()` sobre las filas."""
+        state = self.rollup(by, where, [*map(_n, _as_list(columns)), *map(_sum, _as_list(columns))])
+        sums = _select_columns(state, columns, _sum)
+        result = sums / _select_columns(state, columns, _n).to_numpy()
+        return _unwrap(result, columns)
+
+    def std(self, columns, by=None, where=None):
+        """Desviación estándar muestral (ddof=1) a partir de suma y suma de cuadrados."""
+        names = _as_list(columns)
+        state = self.rollup(by, where, [*map(_n, names), *map(_sum, names), *map(_sumsq, names)])
+        n = _select_columns(state, columns, _n).to_numpy().astype('float64')
+        sums = _select_columns(state, columns, _sum).to_numpy()
+        sumsq = _select_columns(state, columns, _sumsq).to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = (sumsq - sums * sums / n) / (n - 1)
+        values = np.sqrt(np.clip(variance, 0, None))
+        if isinstance(state, pd.Series):
+            result = pd.Series(values, index=_as_list(columns))
+        else:
+            result = pd.DataFrame(values, index=state.index, columns=_as_list(columns))
+        return _unwrap(result, columns)
+
+    def distinct(self, dim, by=None, where=None):
+        """Valores distintos de una dimensión del cubo presentes en la selección."""
+        cells = self.select(where)
+        keys = _as_list(by)
+        if not keys:
+            return cells[dim].nunique()
+        return cells.groupby(keys if len(keys) > 1 else keys[0], observed=True)[dim].nunique()
+
+    def corr(self, columns, where=None):
+        """Correlación de Pearson entre indicadores a partir de sumas y productos cruzados.
+
+        Igual a `DataFrame.corr()` sobre las filas de la selección. Devuelve
+        None si alguna fila seleccionada tiene indicadores vacíos (pandas usa
+        entonces los pares completos, que el cubo no guarda) o si el cubo no
+        tiene los productos cruzados: hay que recorrer las filas.
+        """
+        columns = list(columns)
+        pairs = _pairs(columns)
+        needed = [INCOMPLETE, *map(_n, columns), *map(_sum, columns), *map(_sumsq, columns),
+                  *(_cross(a, b) for a, b in pairs)]
+        if any(col not in self.cells.columns for col in needed):
+            return None
+        state = self.rollup(where=where, columns=needed)
+        if state[INCOMPLETE] > 0:
+            return None
+        n = float(state[_n(columns[0])]) if columns else 0.0
+        sums = {col: state[_sum(col)] for col in columns}
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = {col: (state[_sumsq(col)] - sums[col] ** 2 / n) / (n - 1) for col in columns}
+            matrix = pd.DataFrame(np.nan, index=columns, columns=columns)
+            for col in columns:
+                if variance[col] > 0:
+                    matrix.loc[col, col] = 1.0
+            for a, b in pairs:
+                covariance = (state[_cross(a, b)] - sums[a] * sums[b] / n) / (n - 1)
+                if variance[a] > 0 and variance[b] > 0:
+                    value = np.clip(covariance / np.sqrt(variance[a] * variance[b]), -1.0, 1.0)
+                    matrix.loc[a, b] = matrix.loc[b, a] = value
+        return matrix
+
+    def describe(self, columns, where=None, percentiles=(0.25, 0.5, 0.75)):
+        """Resumen como `DataFrame.describe()` sin recorrer las filas.
+
+        Conteo, media, desviación y extremos son exactos; los percentiles salen
+        de los histogramas por celda con la cota de error de `cobertura.sketch`.
+        Devuelve None si el cubo no tiene histogramas o extremos.
+        """
+        columns = list(columns)
+        if self.sketches is None or any(_min(col) not in self.cells.columns for col in columns):
+            return None
+        cells = self.select(where)
+        names = [*map(_n, columns), *map(_sum, columns), *map(_sumsq, columns)]
+        state = cells[names].sum()
+        n = state[list(map(_n, columns))].to_numpy(dtype='float64')
+        sums = state[list(map(_sum, columns))].to_numpy()
+        sumsq = state[list(map(_sumsq, columns))].to_numpy()
+        minimum = cells[list(map(_min, columns))].min().to_numpy()
+        maximum = cells[list(map(_max, columns))].max().to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = sums / n
+            variance = (sumsq - sums * sums / n) / (n - 1)
+            std = np.sqrt(np.clip(variance, 0, None))
+        quantiles = sketch.quantiles(_filter(self.sketches, where), columns, percentiles)
+        # El representante de la cubeta puede salirse de los extremos exactos
+        quantiles = np.clip(quantiles, minimum, maximum)
+        index = ['count', 'mean', 'std', 'min', *(f'{q * 100:g}%' for q in percentiles), 'max']
+        return pd.DataFrame(np.vstack([n, mean, std, minimum, quantiles, maximum]), index=index, columns=columns)
+
+
+def _filter(frame, where):
+    """Filas de `frame` (celdas o histogramas) que cumplen los filtros sobre las dimensiones."""
+    if not where:
+        return frame
+    mask = np.ones(len(frame), dtype=bool)
+    for dim, value in where.items():
+        if value is None:
+            continue
+        mask &= frame[dim].isin(_as_list(value)).to_numpy()
+    return frame[mask]
+
+
+def _select_columns(state, columns, name=lambda col: col):
+    """Columnas del estado renombradas al nombre del indicador original."""
+    columns = _as_list(columns)
+    if isinstance(state, pd.Series):
+        values = state[[name(col) for col in columns]].astype('float64')
+        values.index = columns
+        return values
+    values = state[[name(col) for col in columns]].astype('float64')
+    values.columns = columns
+    return values
+
+
+def _count(state):
+    if isinstance(state, pd.Series):
+        return float(state[COUNT])
+    return state[COUNT].to_numpy()[:, None]
+
+
+def _unwrap(result, columns):
+    """Con un solo nombre (str) devuelve Serie o escalar en lugar de tabla."""
+    if isinstance(columns, str):
+        return result[columns]
+    return result
@@ -0,0 +1,216 @@
+"""Dataset cargado junto con sus estructuras derivadas."""
+
+import pandas as pd
+
+from cobertura import backends, cache, profiling, shared
+from cobertura.cube import DIMENSIONS, CoverageCube
+from cobertura.filters import FilterEngine
+from cobertura.loader import data_path, normalize
+from cobertura.memo import TTLCache, freeze, register
+
+# Vistas recientes del formato particionado; cada una guarda solo las columnas ya pedidas
+_partition_views = register(TTLCache('particiones', maxsize=8))
+
+
+def _version(path):
+    return f'{cache.source_version(path)[:16]}-s{cache.SCHEMA_VERSION}'
+
+
+def _partition_stamps(source, version):
+    """Versión del CSV base y `{(AÑO, TRIMESTRE): hash}` de los trimestres agregados después."""
+    manifest = (cache.valid_manifest(source) if source else None) or {}
+    if not manifest.get('sha256'):
+        return version, {}
+    stamps = {}
+    # Un segmento posterior reemplaza las particiones que repite
+    for segment in manifest.get('segments', []):
+        for year, quarter in segment['partitions']:
+            stamps[(year, quarter)] = segment['sha256'][:16]
+    return f"{manifest['sha256'][:16]}-s{cache.SCHEMA_VERSION}", stamps
+
+
+def _selected(selection, column):
+    value = (selection or {}).get(column)
+    if value is None:
+        return None
+    values = [value] if isinstance(value, str) or not hasattr(value, '__iter__') else value
+    return {v.item() if hasattr(v, 'item') else v for v in values}
+
+
+class Dataset:
+    """Filas tipadas, cubo de agregados e índice de filtros de una versión de los datos.
+
+    La versión (hash del CSV más el esquema) identifica al dataset en las
+    claves de las cachés de resultados. `backend` es el motor de consultas de
+    `aggregates` (ver `cobertura.backends`); con `source` puede consultar el
+    Parquet de la ingesta de ese CSV.
+    """
+
+    def __init__(self, frame, version, cube=None, source=None):
+        self.source = source
+        self.frame = frame
+        self.columns = list(frame.columns)
+        self.version = version
+        self.base_version, self.appended = _partition_stamps(source, version)
+        self.cube = CoverageCube.build(frame) if cube is None else cube
+        self.filters = FilterEngine(frame)
+        # Opciones de los filtros de la barra lateral, ordenadas
+        self.years = sorted(frame['AÑO'].unique())
+        self.departments = sorted(frame['DEPARTAMENTO'].unique())
+        self.providers = sorted(frame['NOMBRE_PROVEEDOR_COMERCIAL'].unique())
+        self.backend = backends.create(self, source)
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or data_path()
+        # Cubo guardado por `python -m cobertura.ingest`, si corresponde a este CSV
+        cells = cache.read_cube(path)
+        cube = None if cells is None else CoverageCube(cells, cache.read_sketches(path))
+        manifest = cache.valid_manifest(path)
+        if cells is not None and manifest is not None and manifest.get('layout') == 'partitioned':
+            return PartitionedDataset(path, _version(path), cube)
+        version = _version(path)
+        # Filas mapeadas desde el archivo Arrow compartido por todos los procesos
+        frame = shared.load(path, version)
+        return cls(frame, version, cube=cube, source=path)
+
+    @staticmethod
+    def version_token(path=None):
+        """Cambia cuando cambia el CSV o se agrega un trimestre (ver `cache.version_token`)."""
+        return cache.version_token(path or data_path())
+
+    @property
+    def cache_key(self):
+        return ('dataset', self.version)
+
+    def selection_key(self, selection):
+        """Clave de `memo` para una selección: el CSV base y los trimestres agregados que toca.
+
+        Agregar un trimestre (`ingest --append`) solo cambia la clave de las
+        selecciones que incluyen sus particiones (AÑO, TRIMESTRE); las de otros
+        años conservan sus resultados memoizados y precalculados.
+        """
+        years, quarters = _selected(selection, 'AÑO'), _selected(selection, 'TRIMESTRE')
+        touched = tuple(sorted(
+            (year, quarter, stamp) for (year, quarter), stamp in self.appended.items()
+            if (years is None or year in years) and (quarters is None or quarter in quarters)
+        ))
+        return ('dataset', self.base_version, touched)
+
+    def view(self, selection=None):
+        """Filas de la selección como `RowView` (sin copiar el DataFrame)."""
+        view = self.filters.view(self.frame, selection)
+        profiling.add_rows(len(view))
+        return view
+
+
+class PartitionView:
+    """Filas de una selección del formato particionado, leídas por columna al pedirlas.
+
+    Ofrece la misma interfaz que `RowView`. Cada columna pedida sola se lee
+    únicamente de las carpetas de la selección y se guarda en la vista; las
+    tablas de varias columnas (`frame`) se leen sin guardarse, así que la
+    vista nunca retiene todas las columnas de la selección. `take` (la página
+    de la tabla) lee solo los archivos y bloques que contienen esas filas.
+    """
+
+    def __init__(self, source, selection, rows, columns, cube):
+        self.source = source
+        self.selection = selection
+        self.rows = rows
+        self._all_columns = columns
+        self._columns = {}
+        self.cube = cube
+        # Filas de la selección en cada carpeta, calculadas en el primer `take`
+        self._counts = None
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def empty(self):
+        return self.rows == 0
+
+    @property
+    def columns(self):
+        return self._all_columns
+
+    def _read(self, columns):
+        frame = normalize(cache.read_partitions(self.source, where=self.selection, columns=list(columns)))
+        return frame.reset_index(drop=True)
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            return self.frame(list(key))
+        if key not in self._columns:
+            self._columns[key] = self._read([key])[key]
+        return self._columns[key]
+
+    def _group_rows(self):
+        """Filas de la selección en cada carpeta de `cache.partition_groups`, según el cubo."""
+        by = ['AÑO', 'TRIMESTRE']
+        names = {}
+        groups = cache.partition_groups(self.source, self.selection)
+        if groups and cache.DEPARTMENT_PARTITION in groups[0][0]:
+            by.append('DEPARTAMENTO')
+            codes = (cache.valid_manifest(self.source) or {}).get('department_codes', {})
+            names = {code: name for name, values in codes.items() for code in values}
+        counts = {
+            tuple(value.item() if hasattr(value, 'item') else value for value in key): int(rows)
+            for key, rows in self.cube.count(by=by, where=self.selection).items()
+        }
+        result = []
+        for keys, _ in groups:
+            key = [keys['AÑO'], keys['TRIMESTRE']]
+            if names:
+                key.append(names.get(keys[cache.DEPARTMENT_PARTITION]))
+            result.append(counts.get(tuple(key), 0))
+        return result
+
+    def take(self, indices, columns=None):
+        """Filas en `indices`, leídas solo de las carpetas, archivos y bloques que las contienen."""
+        if self._counts is None:
+            self._counts = self._group_rows()
+        columns = list(self._all_columns if columns is None else columns)
+        rows = cache.take_partitions(self.source, list(indices), self.selection, columns, self._counts)
+        return normalize(rows)
+
+    def frame(self, columns=None):
+        columns = list(self._all_columns if columns is None else columns)
+        if all(col in self._columns for col in columns):
+            return pd.DataFrame({col: self._columns[col] for col in columns})
+        return self._read(columns)
+
+
+class PartitionedDataset(Dataset):
+    """Dataset sobre el formato particionado de la ingesta, sin cargar todas las filas.
+
+    Las métricas aditivas salen del cubo guardado; solo las que recorren filas
+    (municipios distintos, correlaciones, etc.) leen de las particiones de la
+    selección las columnas que usan (`PartitionView`). No hay índice de
+    filtros: la poda la hace la lectura.
+    """
+
+    def __init__(self, source, version, cube):
+        self.source = source
+        self.frame = None
+        # Orden de columnas del CSV, registrado por la ingesta
+        self.columns = (cache.valid_manifest(source) or {}).get('columns') or list(DIMENSIONS)
+        self.version = version
+        self.base_version, self.appended = _partition_stamps(source, version)
+        self.cube = cube
+        self.filters = None
+        cells = cube.cells
+        self.years = sorted(cells['AÑO'].unique())
+        self.departments = sorted(cells['DEPARTAMENTO'].unique())
+        self.providers = sorted(cells['NOMBRE_PROVEEDOR_COMERCIAL'].unique())
+        self.backend = backends.create(self, source)
+
+    def view(self, selection=None):
+        key = (self.selection_key(selection), freeze(selection or {}))
+        found, view = _partition_views.get(key)
+        if not found:
+            view = PartitionView(self.source, selection, self.cube.count(where=selection), self.columns, self.cube)
+            _partition_views.put(key, view)
+        profiling.add_rows(len(view))
+        return view
@@ -0,0 +1,267 @@
+"""Exportación por bloques de la selección filtrada y de las tablas de los gráficos.
+
+Los archivos se generan como una secuencia de fragmentos de bytes: las filas
+se leen de a `CHUNK_ROWS` (posiciones de la vista en memoria o lotes del
+Parquet particionado) y cada bloque se codifica y se entrega antes de leer el
+siguiente. En CSV cada bloque es un trozo de texto; en Parquet cada bloque es
+un row group. La memoria usada depende del tamaño del bloque, no del archivo.
+
+Para descargar sin que Streamlit guarde el archivo completo,
+`COBERTURA_EXPORT_PORT` levanta un servidor HTTP en un hilo de fondo que
+transmite las descargas con `Transfer-Encoding: chunked`; cada descarga se
+identifica con un token que no se puede adivinar (`register` / `url`). Cada
+descarga corre en su propio hilo, así que no bloquea los reruns de otras
+sesiones. `COBERTURA_EXPORT_URL` indica la dirección pública del servidor
+si está detrás de un proxy.
+
+Sin servidor, `to_file` vuelca los bloques a un archivo temporal para un
+`st.download_button`. También hay una línea de comandos:
+
+    python -m cobertura.export --year 2024 --format parquet -o cobertura_2024.parquet
+
+El CSV conserva el esquema de entrada (cobertura en SÍ/NO), así que
+`loader.read_csv` lo vuelve a leer igual; `--check` lo relee y compara los
+registros con cobertura de cada tecnología con los del cubo.
+"""
+
+import argparse
+import hashlib
+import hmac
+import io
+import logging
+import os
+import secrets
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from cobertura import cache, report
+from cobertura.dataset import Dataset
+from cobertura.loader import COVERAGE_COLS, denormalize, normalize, read_csv
+from cobertura.memo import TTLCache, freeze
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow es opcional
+    pa = pq = None
+
+EXPORT_PORT_ENV = 'COBERTURA_EXPORT_PORT'
+EXPORT_URL_ENV = 'COBERTURA_EXPORT_URL'
+
+FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+CHUNK_ROWS = 100_000
+
+# Los archivos temporales pasan a disco por encima de este tamaño
+SPOOL_BYTES = 16 * 2**20
+
+logger = logging.getLogger(__name__)
+
+_downloads = TTLCache('export.descargas', maxsize=256, ttl=3600)
+_secret = secrets.token_bytes(16)
+_server = None
+_server_lock = threading.Lock()
+
+
+def row_chunks(dataset, selection, columns=None, chunk_rows=CHUNK_ROWS):
+    """Filas de la selección en DataFrames de hasta `chunk_rows` filas (al menos uno)."""
+    if dataset.frame is None:
+        # Dataset particionado: lotes leídos directamente de las carpetas de la selección
+        for chunk in cache.iter_partitions(dataset.source, selection, columns, chunk_rows):
+            yield normalize(chunk)
+        return
+    view = dataset.view(selection)
+    for start in range(0, max(len(view), 1), chunk_rows):
+        yield view.take(range(start, min(start + chunk_rows, len(view))), columns)
+
+
+def table_chunks(table, chunk_rows=CHUNK_ROWS):
+    """Una tabla de agregados en bloques; el índice con nombre pasa a ser columna."""
+    frame = table.to_frame() if isinstance(table, pd.Series) else table
+    if not isinstance(frame.index, pd.RangeIndex) or any(frame.index.names):
+        frame = frame.reset_index()
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+class _Buffer(io.RawIOBase):
+    """Destino de escritura que entrega y descarta lo escrito en cada `drain`."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def encode(chunks, fmt='csv'):
+    """Codifica los bloques como fragmentos de un archivo CSV o Parquet."""
+    if fmt not in FORMATS:
+        raise ValueError(f'Formato desconocido: {fmt} (opciones: {", ".join(FORMATS)})')
+    if fmt == 'csv':
+        for number, chunk in enumerate(chunks):
+            # Cobertura en SÍ/NO, como el CSV de origen
+            yield denormalize(chunk).to_csv(index=False, header=number == 0).encode('utf-8')
+        return
+    if pq is None:
+        raise ImportError('La exportación a Parquet requiere pyarrow (pip install pyarrow)')
+    sink = _Buffer()
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        # Un row group por bloque: lo escrito se entrega antes de leer el siguiente
+        writer.write_table(table.cast(writer.schema))
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def to_bytes(chunks, fmt='csv'):
+    """El archivo completo en memoria; solo para tablas pequeñas de agregados."""
+    return b''.join(encode(chunks, fmt))
+
+
+def to_file(chunks, fmt='csv'):
+    """El archivo en un temporal (en disco si supera `SPOOL_BYTES`), listo para leer."""
+    target = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    for data in encode(chunks, fmt):
+        target.write(data)
+    target.seek(0)
+    return target
+
+
+def file_name(name, fmt):
+    return f'{name}.{fmt}'
+
+
+def register(dataset, selection, fmt='csv', columns=None, name='cobertura_filtrada'):
+    """Registra la descarga de la selección en el servidor; devuelve su token.
+
+    El token depende del dataset, la selección y el formato (más un secreto del
+    proceso), así que los reruns con los mismos filtros reutilizan el enlace.
+    """
+    key = (dataset.version, freeze(selection or {}), fmt, freeze(columns), name)
+    token = hmac.new(_secret, repr(key).encode(), hashlib.sha256).hexdigest()[:32]
+    _downloads.put(token, (dataset, selection, fmt, columns, name))
+    return token
+
+
+def url(token):
+    base = os.environ.get(EXPORT_URL_ENV) or f'http://localhost:{os.environ.get(EXPORT_PORT_ENV)}'
+    return f'{base.rstrip("/")}/export/{token}'
+
+
+class _ExportHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parts = self.path.split('?')[0].strip('/').split('/')
+        found, download = _downloads.get(parts[1]) if len(parts) == 2 and parts[0] == 'export' else (False, None)
+        if not found:
+            self.send_error(404, 'Descarga vencida o desconocida')
+            return
+        dataset, selection, fmt, columns, name = download
+        self.send_response(200)
+        self.send_header('Content-Type', FORMATS[fmt])
+        self.send_header('Content-Disposition', f'attachment; filename="{file_name(name, fmt)}"')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            for data in encode(row_chunks(dataset, selection, columns), fmt):
+                if data:
+                    self.wfile.write(b'%x\r\n%b\r\n' % (len(data), data))
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info('descarga %s cancelada por el cliente', file_name(name, fmt))
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        logger.debug('export: ' + format, *args)
+
+
+def serve(port, host='127.0.0.1'):
+    """Sirve `/export/<token>` en un hilo de fondo; una sola vez por proceso."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), _ExportHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name='cobertura-export', daemon=True).start()
+        return _server
+
+
+def check(path, dataset, selection, fmt='csv'):
+    """Relee el archivo exportado y compara sus registros con cobertura con los del cubo.
+
+    Devuelve `{columna: (esperado, en el archivo)}` de las columnas que no coinciden.
+    """
+    if fmt == 'csv':
+        header = pd.read_csv(path, nrows=0).columns
+        columns = [col for col in COVERAGE_COLS if col in header]
+        frame = read_csv(path, columns=columns)
+    else:
+        frame = normalize(pd.read_parquet(path))
+        columns = [col for col in COVERAGE_COLS if col in frame.columns]
+    expected = dataset.cube.rollup(where=selection, columns=columns)
+    found = frame[columns].sum()
+    return {col: (int(expected[col]), int(found[col])) for col in columns if expected[col] != found[col]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Exporta las filas filtradas a CSV o Parquet por bloques.')
+    parser.add_argument('--data', help='CSV de origen (por defecto COBERTURA_DATA_PATH o el CSV del proyecto)')
+    parser.add_argument('--year', type=int)
+    parser.add_argument('--department')
+    parser.add_argument('--provider')
+    parser.add_argument('--columns', nargs='+', help='Columnas a exportar (por defecto todas)')
+    parser.add_argument('--format', choices=list(FORMATS), default='csv')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--check', action='store_true',
+                        help='Releer el archivo y comparar los registros con cobertura con los del cubo')
+    args = parser.parse_args(argv)
+
+    dataset = Dataset.load(args.data)
+    selection = report.selection(args.year, args.department, args.provider)
+    chunks = row_chunks(dataset, selection, args.columns, args.chunk_rows)
+    tmp = f'{args.output}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as target:
+        for data in encode(chunks, args.format):
+            target.write(data)
+    os.replace(tmp, args.output)
+    print(f'{dataset.cube.count(where=selection):,} filas -> {args.output}')
+    if args.check:
+        differences = check(args.output, dataset, selection, args.format)
+        for col, (expected, found) in differences.items():
+            print(f'{col}: {expected:,} registros con cobertura, {found:,} en el archivo')
+        if differences:
+            raise SystemExit(1)
+        print('Verificación: registros con cobertura iguales a los del cubo')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Motor de filtros con índices de bitmap para los filtros de la barra lateral.
+
+Al cargar los datos se construye un bitmap empaquetado (1 bit por fila) para
+cada valor distinto de AÑO, DEPARTAMENTO y NOMBRE_PROVEEDOR_COMERCIAL. Una
+selección se resuelve con OR entre los valores elegidos de cada columna y AND
+entre columnas; el resultado son posiciones de fila, no un DataFrame copiado.
+Las selecciones recientes se guardan en una caché LRU.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ['AÑO', 'DEPARTAMENTO', 'NOMBRE_PROVEEDOR_COMERCIAL']
+
+
+def _factorize(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values, sort=True)
+
+
+class FilterEngine:
+    """Bitmaps por valor de cada columna filtrable y memo de selecciones."""
+
+    def __init__(self, df, columns=FILTER_COLUMNS, cache_size=64):
+        self.rows = len(df)
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._bitmaps = {}
+        self._empty = np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        for col in columns:
+            codes, uniques = _factorize(df[col])
+            self._bitmaps[col] = {
+                value: np.packbits(codes == code) for code, value in enumerate(uniques)
+            }
+
+    def values(self, col):
+        """Valores indexados de una columna."""
+        return list(self._bitmaps[col])
+
+    def _normalize(self, where):
+        """Clave canónica de la selección; omite columnas sin filtro efectivo."""
+        key = []
+        for col, value in sorted((where or {}).items()):
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) or np.isscalar(value) else list(value)
+            selected = frozenset(values)
+            # Elegir todos los valores equivale a no filtrar esa columna
+            if selected.issuperset(self._bitmaps[col]):
+                continue
+            key.append((col, selected))
+        return tuple(key)
+
+    def _resolve(self, key):
+        mask = None
+        for col, selected in key:
+            bitmaps = self._bitmaps[col]
+            column_mask = self._empty.copy()
+            for value in selected:
+                bitmap = bitmaps.get(value)
+                if bitmap is not None:
+                    np.bitwise_or(column_mask, bitmap, out=column_mask)
+            if mask is None:
+                mask = column_mask
+            else:
+                np.bitwise_and(mask, column_mask, out=mask)
+        return np.flatnonzero(np.unpackbits(mask, count=self.rows))
+
+    def positions(self, where=None):
+        """Posiciones de las filas que cumplen `{columna: valor o lista}`.
+
+        Devuelve None cuando la selección abarca todas las filas.
+        """
+        key = self._normalize(where)
+        if not key:
+            return None
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        result = self._resolve(key)
+        result.flags.writeable = False
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Vacía la caché de selecciones (los bitmaps se conservan)."""
+        with self._lock:
+            self._cache.clear()
+
+    def view(self, df, where=None):
+        """Vista de filas de `df` para la selección, sin copiar el DataFrame."""
+        return RowView(df, self.positions(where))
+
+
+class RowView:
+    """Subconjunto de filas descrito por posiciones sobre el DataFrame original.
+
+    Solo se materializan las columnas que se piden, y cada una una sola vez.
+    """
+
+    def __init__(self, df, positions=None):
+        self.df = df
+        self.positions = positions
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.df) if self.positions is None else len(self.positions)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def columns(self):
+        return self.df.columns
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            return self.frame(list(key))
+        if self.positions is None:
+            return self.df[key]
+        if key not in self._columns:
+            self._columns[key] = self.df[key].take(self.positions)
+        return self._columns[key]
+
+    def take(self, indices, columns=None):
+        """Filas `indices` de la selección (posiciones dentro de la vista), solo con `columns`."""
+        df = self.df if columns is None else self.df[list(columns)]
+        indices = np.asarray(indices, dtype='int64')
+        return df.take(indices if self.positions is None else self.positions[indices])
+
+    def frame(self, columns=None):
+        """Materializa la selección como DataFrame (opcionalmente solo algunas columnas)."""
+        df = self.df if columns is None else self.df[columns]
+        if self.positions is None:
+            return df
+        return df.take(self.positions)
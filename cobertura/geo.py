@@ -0,0 +1,317 @@
+"""Coordenadas por código DANE y agregación de puntos en celdas para el mapa.
+
+Las coordenadas salen de un archivo incluido en el paquete
+(`cobertura/data/coordenadas_dane.csv`: COD_DANE, NIVEL, NOMBRE, LATITUD,
+LONGITUD), así que el mapa no consulta ningún servicio externo. El archivo
+trae los departamentos y los municipios y centros poblados del CSV del
+proyecto (códigos y nombres de la DIVIPOLA) ubicados con GeoNames
+(geonames.org, CC BY 4.0) por departamento y nombre:
+
+    python -m cobertura.geo --geonames cities500.txt --data cobertura.csv
+
+Con la DIVIPOLA del DANE (que trae sus propias coordenadas) se agregan o
+corrigen todos los códigos del país:
+
+    python -m cobertura.geo --divipola DIVIPOLA_Centros_Poblados.csv
+
+Un código sin coordenadas propias se ubica con las de su código padre (el
+centro poblado 27250034 pertenece al municipio 27250 y este al departamento
+27); cada punto indica en qué nivel quedó ubicado.
+
+Con miles de municipios o decenas de miles de centros poblados, enviar un
+punto por código al navegador no escala. `grid_bins` los agrupa en el
+servidor en celdas de una cuadrícula cuyo tamaño depende del zoom (una
+celda ≈ 1/8 de una tesela del mapa) y nunca devuelve más de `MAX_BINS`
+celdas: si hay más, usa el zoom inmediatamente menor.
+"""
+
+import argparse
+import functools
+import os
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+COORDINATES_PATH = os.path.join(os.path.dirname(__file__), 'data', 'coordenadas_dane.csv')
+COLUMNS = ['COD_DANE', 'NIVEL', 'NOMBRE', 'LATITUD', 'LONGITUD']
+
+# Columna del dataset -> nivel del archivo de coordenadas, de mayor a menor detalle
+LEVELS = {
+    'COD_CENTRO_POBLADO': 'centro_poblado',
+    'COD_MUNICIPIO': 'municipio',
+    'COD_DEPARTAMENTO': 'departamento',
+}
+
+# Centro del país, usado para departamentos sin coordenadas conocidas
+COLOMBIA_CENTER = {'lat': 4.5709, 'lon': -74.2973}
+
+# Columnas del volcado de lugares de GeoNames (cities500.txt, separado por tabuladores)
+GEONAMES_COLUMNS = [
+    'geonameid', 'name', 'asciiname', 'alternatenames', 'latitude', 'longitude', 'feature_class',
+    'feature_code', 'country_code', 'cc2', 'admin1', 'admin2', 'admin3', 'admin4', 'population',
+    'elevation', 'dem', 'timezone', 'modification_date',
+]
+
+# Distancia máxima (grados) de un centro poblado de GeoNames a su municipio para aceptarlo
+MAX_TOWN_DISTANCE = 0.5
+
+# Celdas por tesela de 256 px y tope de celdas enviadas al navegador
+CELLS_PER_TILE = 8
+MAX_BINS = 2000
+MIN_ZOOM = 3
+
+
+def normalize_name(name):
+    """Nombre en mayúsculas sin tildes, para comparar con el texto del CSV."""
+    text = unicodedata.normalize('NFKD', str(name).strip().upper())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+@functools.lru_cache(maxsize=4)
+def load_coordinates(path=COORDINATES_PATH):
+    """Tabla de coordenadas indexada por (NIVEL, COD_DANE)."""
+    table = pd.read_csv(path, dtype={'COD_DANE': 'int64', 'NIVEL': str, 'NOMBRE': str})
+    return table.set_index(['NIVEL', 'COD_DANE']).sort_index()
+
+
+def department_coordinates(path=COORDINATES_PATH):
+    """`{nombre normalizado: {'lat', 'lon'}}` de los departamentos."""
+    departments = load_coordinates(path).loc['departamento']
+    return {
+        normalize_name(row.NOMBRE): {'lat': row.LATITUD, 'lon': row.LONGITUD}
+        for row in departments.itertuples()
+    }
+
+
+def resolve(codes, level, path=COORDINATES_PATH):
+    """Latitud, longitud y nivel de ubicación de cada código de `level`.
+
+    Los códigos sin coordenadas se ubican con las de su código padre; los que
+    no se encuentran en ningún nivel quedan con NaN.
+    """
+    table = load_coordinates(path)
+    levels = list(LEVELS)[list(LEVELS).index(level):]
+    codes = pd.Index(codes)
+    result = pd.DataFrame({'lat': np.nan, 'lon': np.nan, 'ubicado_en': None}, index=codes)
+    current = pd.Series(np.asarray(codes, dtype='int64'), index=codes)
+    for depth, column in enumerate(levels):
+        if depth:
+            # Los códigos DANE anidan tres dígitos por nivel: 27250034 -> 27250 -> 27
+            current = current // 1000
+        name = LEVELS[column]
+        if name not in table.index.get_level_values(0):
+            continue
+        coords = table.loc[name].reindex(current.to_numpy())
+        missing = result['lat'].isna().to_numpy() & coords['LATITUD'].notna().to_numpy()
+        result.loc[missing, 'lat'] = coords['LATITUD'].to_numpy()[missing]
+        result.loc[missing, 'lon'] = coords['LONGITUD'].to_numpy()[missing]
+        result.loc[missing, 'ubicado_en'] = name
+    return result
+
+
+def cell_size(zoom):
+    """Lado de la celda en grados para un nivel de zoom de mapa web."""
+    return 360 / (2 ** zoom * CELLS_PER_TILE)
+
+
+def grid_bins(points, zoom, weight='registros', counts=(), max_bins=MAX_BINS):
+    """Agrupa `points` (lat, lon, `weight` y medidas) en celdas de la cuadrícula.
+
+    Las medidas se promedian ponderadas por `weight`, las columnas de `counts`
+    se suman y cada celda se ubica en el centroide ponderado de sus puntos. En
+    las latitudes de Colombia la cuadrícula en grados es prácticamente
+    cuadrada, así que no se proyecta a Web Mercator. `attrs['zoom']` guarda
+    el zoom usado.
+    """
+    counts = list(counts)
+    measures = [col for col in points.columns if col not in ('lat', 'lon', weight, *counts)]
+    weights = points[weight].to_numpy(dtype='float64')
+    weighted = pd.DataFrame({
+        **{col: points[col].to_numpy(dtype='float64') * weights for col in ['lat', 'lon', *measures]},
+        weight: weights,
+        'puntos': 1,
+        **{col: points[col].to_numpy(dtype='int64') for col in counts},
+    })
+    lat, lon = points['lat'].to_numpy(), points['lon'].to_numpy()
+    zoom = int(zoom)
+    while True:
+        size = cell_size(zoom)
+        bins = weighted.groupby([np.floor(lat / size), np.floor(lon / size)], sort=True).sum()
+        if len(bins) <= max_bins or zoom <= MIN_ZOOM:
+            break
+        zoom -= 1
+    total = bins[weight].replace(0, np.nan)
+    for col in ['lat', 'lon', *measures]:
+        bins[col] = bins[col] / total
+    bins[weight] = bins[weight].astype('int64')
+    bins = bins.reset_index(drop=True)
+    bins.attrs['zoom'] = zoom
+    return bins
+
+
+def _find(columns, *words):
+    for col in columns:
+        normalized = normalize_name(col)
+        if all(word in normalized for word in words):
+            return col
+    return None
+
+
+def _number(values):
+    return pd.to_numeric(values.astype(str).str.replace(',', '.', regex=False), errors='coerce')
+
+
+def from_divipola(path):
+    """Filas de municipios y centros poblados desde un CSV de la DIVIPOLA del DANE.
+
+    Reconoce las columnas por nombre (código y nombre del centro poblado y del
+    municipio, latitud, longitud). Un municipio sin fila propia toma las
+    coordenadas de su cabecera (centro poblado terminado en 000) o, si no la
+    hay, el promedio de sus centros poblados.
+    """
+    frame = pd.read_csv(path, dtype=str, sep=None, engine='python', encoding='utf-8-sig')
+    columns = list(frame.columns)
+    lat, lon = _find(columns, 'LATITUD'), _find(columns, 'LONGITUD')
+    town_code, town_name = _find(columns, 'COD', 'CENTRO'), _find(columns, 'NOMBRE', 'CENTRO')
+    city_code, city_name = _find(columns, 'COD', 'MUNICIPIO'), _find(columns, 'NOMBRE', 'MUNICIPIO')
+    if lat is None or lon is None or (town_code is None and city_code is None):
+        raise ValueError(f'{path}: faltan columnas de código, latitud o longitud (columnas: {columns})')
+    frame = frame.assign(LATITUD=_number(frame[lat]), LONGITUD=_number(frame[lon])).dropna(
+        subset=['LATITUD', 'LONGITUD'])
+    rows = []
+    if town_code is not None:
+        towns = pd.DataFrame({
+            'COD_DANE': pd.to_numeric(frame[town_code], errors='coerce'),
+            'NIVEL': 'centro_poblado',
+            'NOMBRE': frame[town_name] if town_name else '',
+            'LATITUD': frame['LATITUD'],
+            'LONGITUD': frame['LONGITUD'],
+            'MUNICIPIO_NOMBRE': frame[city_name] if city_name else '',
+        }).dropna(subset=['COD_DANE'])
+        towns['COD_DANE'] = towns['COD_DANE'].astype('int64')
+        rows.append(towns[COLUMNS])
+        towns['MUNICIPIO'] = towns['COD_DANE'] // 1000
+        # La cabecera municipal (código terminado en 000) ubica al municipio; si falta, el promedio
+        towns['CABECERA'] = towns['COD_DANE'] % 1000 == 0
+        groups = towns.sort_values('CABECERA', ascending=False).groupby('MUNICIPIO')
+        cities = groups.agg(NOMBRE=('MUNICIPIO_NOMBRE', 'first'), CABECERA=('CABECERA', 'first'),
+                            LATITUD=('LATITUD', 'first'), LONGITUD=('LONGITUD', 'first'))
+        means = groups[['LATITUD', 'LONGITUD']].mean()
+        cities.loc[~cities['CABECERA'], ['LATITUD', 'LONGITUD']] = means.loc[~cities['CABECERA']]
+        rows.append(cities.rename_axis('COD_DANE').reset_index().assign(NIVEL='municipio')[COLUMNS])
+    else:
+        rows.append(pd.DataFrame({
+            'COD_DANE': pd.to_numeric(frame[city_code], errors='coerce'),
+            'NIVEL': 'municipio',
+            'NOMBRE': frame[city_name] if city_name else '',
+            'LATITUD': frame['LATITUD'],
+            'LONGITUD': frame['LONGITUD'],
+        }).dropna(subset=['COD_DANE']))
+    result = pd.concat(rows, ignore_index=True)
+    result['COD_DANE'] = result['COD_DANE'].astype('int64')
+    return result[COLUMNS].drop_duplicates(['NIVEL', 'COD_DANE'])
+
+
+def _geonames_places(path):
+    """Lugares de Colombia del volcado de GeoNames, un registro por nombre normalizado."""
+    frame = pd.read_csv(path, sep='\t', header=None, names=GEONAMES_COLUMNS, dtype=str,
+                        keep_default_na=False, quoting=3)
+    frame = frame[frame['country_code'] == 'CO']
+    frame = frame.assign(latitude=_number(frame['latitude']), longitude=_number(frame['longitude']),
+                         population=pd.to_numeric(frame['population'], errors='coerce').fillna(0))
+    names = frame['name'] + ',' + frame['asciiname'] + ',' + frame['alternatenames']
+    # El nombre principal va primero: una coincidencia con él gana a la de un nombre alterno
+    keys = names.str.split(',').explode().map(normalize_name)
+    places = frame.loc[keys.index].assign(key=keys.to_numpy(), alterno=keys.groupby(level=0).cumcount() > 1)
+    places = places[places['key'] != '']
+    return places[['key', 'alterno', 'admin1', 'latitude', 'longitude', 'population']]
+
+
+def _best(matches, by):
+    """La coincidencia por nombre principal y más poblada de cada grupo."""
+    return matches.sort_values(['alterno', 'population'], ascending=[True, False]).drop_duplicates(by)
+
+
+def from_geonames(path, places):
+    """Filas de municipios y centros poblados ubicados con el volcado de GeoNames.
+
+    `places` trae los códigos y nombres DIVIPOLA (COD_DEPARTAMENTO,
+    COD_MUNICIPIO, MUNICIPIO, COD_CENTRO_POBLADO, CENTRO_POBLADO), como las
+    columnas del CSV de cobertura. GeoNames no usa códigos DANE: cada región
+    de GeoNames se asigna al departamento con más municipios del mismo nombre
+    y cada código se busca por nombre dentro de su departamento. Un centro
+    poblado solo se acepta a menos de `MAX_TOWN_DISTANCE` grados de su
+    municipio; la cabecera toma las coordenadas del municipio.
+    """
+    geonames = _geonames_places(path)
+    cities = places[['COD_DEPARTAMENTO', 'COD_MUNICIPIO', 'MUNICIPIO']].drop_duplicates('COD_MUNICIPIO')
+    cities = cities.assign(key=cities['MUNICIPIO'].map(normalize_name))
+    votes = cities.merge(geonames[~geonames['alterno']], on='key')
+    regions = votes.groupby('admin1')['COD_DEPARTAMENTO'].agg(lambda codes: codes.value_counts().index[0])
+    geonames = geonames.assign(COD_DEPARTAMENTO=geonames['admin1'].map(regions)).dropna(subset=['COD_DEPARTAMENTO'])
+
+    found = _best(cities.merge(geonames, on=['COD_DEPARTAMENTO', 'key']), 'COD_MUNICIPIO')
+    cities_out = pd.DataFrame({
+        'COD_DANE': found['COD_MUNICIPIO'], 'NIVEL': 'municipio', 'NOMBRE': found['MUNICIPIO'],
+        'LATITUD': found['latitude'], 'LONGITUD': found['longitude'],
+    })
+
+    towns = places[['COD_DEPARTAMENTO', 'COD_MUNICIPIO', 'COD_CENTRO_POBLADO', 'CENTRO_POBLADO']]
+    towns = towns.drop_duplicates('COD_CENTRO_POBLADO')
+    towns = towns.assign(key=towns['CENTRO_POBLADO'].map(normalize_name)).merge(
+        cities_out[['COD_DANE', 'LATITUD', 'LONGITUD']], left_on='COD_MUNICIPIO', right_on='COD_DANE')
+    seats = towns[towns['COD_CENTRO_POBLADO'] % 1000 == 0]
+    matches = towns[towns['COD_CENTRO_POBLADO'] % 1000 != 0].merge(geonames, on=['COD_DEPARTAMENTO', 'key'])
+    distance = np.hypot(matches['latitude'] - matches['LATITUD'], matches['longitude'] - matches['LONGITUD'])
+    matches = _best(matches[distance <= MAX_TOWN_DISTANCE], 'COD_CENTRO_POBLADO')
+    towns_out = pd.concat([
+        pd.DataFrame({'COD_DANE': seats['COD_CENTRO_POBLADO'], 'NOMBRE': seats['CENTRO_POBLADO'],
+                      'LATITUD': seats['LATITUD'], 'LONGITUD': seats['LONGITUD']}),
+        pd.DataFrame({'COD_DANE': matches['COD_CENTRO_POBLADO'], 'NOMBRE': matches['CENTRO_POBLADO'],
+                      'LATITUD': matches['latitude'], 'LONGITUD': matches['longitude']}),
+    ]).assign(NIVEL='centro_poblado')
+    result = pd.concat([cities_out, towns_out[COLUMNS]], ignore_index=True)
+    result['COD_DANE'] = result['COD_DANE'].astype('int64')
+    return result[COLUMNS]
+
+
+def merge(base, extra):
+    """Filas de `base` reemplazadas o completadas con las de `extra`, de departamentos a centros poblados."""
+    merged = pd.concat([extra, base], ignore_index=True).drop_duplicates(['NIVEL', 'COD_DANE'])
+    order = {name: depth for depth, name in enumerate(reversed(list(LEVELS.values())))}
+    merged['_orden'] = merged['NIVEL'].map(order)
+    return merged.sort_values(['_orden', 'COD_DANE']).drop(columns='_orden')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Agrega coordenadas de municipios y centros poblados al archivo de coordenadas.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--divipola', help='CSV de la DIVIPOLA del DANE (centros poblados o municipios)')
+    source.add_argument('--geonames', help='Volcado de lugares de GeoNames (cities500.txt)')
+    parser.add_argument('--data', help='CSV de cobertura con los códigos a ubicar con --geonames '
+                                       '(por defecto COBERTURA_DATA_PATH o el CSV del proyecto)')
+    parser.add_argument('-o', '--output', default=COORDINATES_PATH,
+                        help='Archivo de coordenadas a escribir (por defecto el del paquete)')
+    args = parser.parse_args(argv)
+
+    base = load_coordinates(COORDINATES_PATH).reset_index()[COLUMNS]
+    if args.divipola:
+        extra = from_divipola(args.divipola)
+    else:
+        from cobertura.loader import data_path
+        places = pd.read_csv(args.data or data_path(), usecols=[
+            'COD_DEPARTAMENTO', 'COD_MUNICIPIO', 'MUNICIPIO', 'COD_CENTRO_POBLADO', 'CENTRO_POBLADO'])
+        extra = from_geonames(args.geonames, places)
+    table = merge(base, extra)
+    tmp = f'{args.output}.{os.getpid()}.tmp'
+    table.to_csv(tmp, index=False, float_format='%.6f')
+    os.replace(tmp, args.output)
+    load_coordinates.cache_clear()
+    counts = table['NIVEL'].value_counts()
+    print(', '.join(f'{counts.get(name, 0)} {name}' for name in reversed(list(LEVELS.values()))),
+          f'-> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
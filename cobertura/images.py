@@ -0,0 +1,104 @@
+"""Gráficos de matplotlib renderizados una sola vez a imagen.
+
+Las figuras se crean con `matplotlib.figure.Figure` y no con `plt.subplots`,
+así que nunca entran en el registro de pyplot: al terminar de renderizarlas se
+vacían y el recolector las libera, y la memoria del servidor no crece con los
+reruns. La imagen resultante (PNG, o SVG con `COBERTURA_CHART_FORMAT=svg`)
+se memoiza por (datos, parámetros), de modo que un gráfico sin cambios no se
+vuelve a rasterizar.
+"""
+
+import io
+import os
+
+from matplotlib.figure import Figure
+
+from cobertura.memo import memoize
+
+FORMAT_ENV = 'COBERTURA_CHART_FORMAT'
+CHART_FORMAT = os.environ.get(FORMAT_ENV, 'png').lower()
+
+# Mismos valores que usa st.pyplot por defecto
+DPI = 200
+IMAGE_CACHE_SIZE = 64
+
+
+def _render(fig, fmt):
+    """PNG en bytes o SVG en texto; la figura se vacía al terminar."""
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=fmt, dpi=DPI, bbox_inches='tight')
+    finally:
+        fig.clear()
+    data = buffer.getvalue()
+    return data.decode('utf-8') if fmt == 'svg' else data
+
+
+def _label_bars(ax, bars, label_format):
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+               label_format.format(int(height)), ha='center', va='bottom')
+
+
+@memoize(maxsize=IMAGE_CACHE_SIZE)
+def bar_chart(values, title, xlabel, ylabel, color, figsize=(12, 6), rotate=True,
+              label_format='{:,}', fmt=CHART_FORMAT):
+    """Barras verticales de una Series con el valor sobre cada barra."""
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    bars = ax.bar(range(len(values)), values.values, color=color)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_xticks(range(len(values)))
+    if rotate:
+        ax.set_xticklabels(values.index, rotation=45, ha='right')
+    else:
+        ax.set_xticklabels(values.index)
+    _label_bars(ax, bars, label_format)
+    return _render(fig, fmt)
+
+
+@memoize(maxsize=IMAGE_CACHE_SIZE)
+def barh_chart(values, title, xlabel, ylabel, color, figsize=(10, 6),
+               label_format='{:.1f}', fmt=CHART_FORMAT):
+    """Barras horizontales de una Series con el valor al final de cada barra."""
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    bars = ax.barh(range(len(values)), values.values, color=color)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_yticks(range(len(values)))
+    ax.set_yticklabels(values.index)
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width, bar.get_y() + bar.get_height()/2.,
+               label_format.format(width), ha='left', va='center')
+    return _render(fig, fmt)
+
+
+@memoize(maxsize=IMAGE_CACHE_SIZE)
+def pie_chart(values, title, figsize=(8, 6), fmt=CHART_FORMAT):
+    """Torta de una Series con el porcentaje de cada porción."""
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    ax.pie(values.values, labels=values.index, autopct='%1.1f%%', startangle=90)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    return _render(fig, fmt)
+
+
+@memoize(maxsize=IMAGE_CACHE_SIZE)
+def line_panels(frame, x, panels, xlabel, figsize=(12, 12), fmt=CHART_FORMAT):
+    """Un panel por indicador; `panels` son tuplas (columna, título, etiqueta Y, marcador, color)."""
+    fig = Figure(figsize=figsize)
+    axes = fig.subplots(len(panels), 1, squeeze=False)[:, 0]
+    for ax, (column, title, ylabel, marker, color) in zip(axes, panels):
+        ax.plot(frame[x], frame[column], marker=marker, color=color, linewidth=2)
+        ax.set_title(title, fontsize=12, fontweight='bold')
+        ax.set_ylabel(ylabel)
+        ax.grid(True, alpha=0.3)
+    axes[-1].set_xlabel(xlabel)
+    fig.tight_layout()
+    return _render(fig, fmt)
@@ -0,0 +1,293 @@
+"""Ingesta por bloques de CSV que no caben en memoria.
+
+Lee el CSV en bloques de `chunksize` filas, normaliza los tipos de cada bloque
+y lo acumula directamente en el cubo de agregados y, opcionalmente, en el
+Parquet de la caché. El pico de memoria queda acotado por el tamaño del
+bloque más el cubo (una fila por AÑO × TRIMESTRE × DEPARTAMENTO × PROVEEDOR).
+
+Por defecto las filas se guardan particionadas por AÑO y TRIMESTRE (y, con
+`--by-department`, por COD_DEPARTAMENTO), de modo que el dashboard solo lee
+las particiones de la selección de la barra lateral.
+
+`append` incorpora el CSV de un trimestre nuevo sin reprocesar el resto: lo
+guarda como segmento de la caché, sustituye en el cubo solo las celdas de sus
+particiones (AÑO, TRIMESTRE) y cambia la versión del dataset.
+
+Uso desde la línea de comandos, fuera de Streamlit::
+
+    python -m cobertura.ingest cobertura_colombia_2017_2024_limpio_V2.csv --chunksize 500000
+    python -m cobertura.ingest --by-department
+    python -m cobertura.ingest --append cobertura_2025_T1.csv
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from cobertura import cache
+from cobertura.cube import CoverageCube
+from cobertura.loader import DATA_PATH, csv_dtypes, normalize
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow es opcional
+    pa = pq = None
+
+CHUNK_ROWS = 250_000
+LAYOUTS = ('partitioned', 'file')
+
+logger = logging.getLogger(__name__)
+
+
+def iter_chunks(path=DATA_PATH, chunksize=CHUNK_ROWS, columns=None):
+    """Bloques del CSV ya normalizados con el esquema tipado."""
+    reader = pd.read_csv(path, usecols=columns, dtype=csv_dtypes(columns), chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            yield normalize(chunk)
+
+
+def _arrow_schema(frame):
+    """Esquema fijo para todos los bloques.
+
+    Las categorías de cada bloque son distintas, así que los diccionarios se
+    declaran con índices int32 en lugar del entero mínimo de cada bloque.
+    """
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    fields = [
+        pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+        if pa.types.is_dictionary(field.type) else field
+        for field in schema
+    ]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+class _RowWriter:
+    """Escribe bloques tipados en un Parquet único o en carpetas particionadas."""
+
+    def __init__(self, target, partition_by=None):
+        self.target = target
+        self.partition_by = partition_by
+        self.schema = None
+        self.blocks = 0
+        self._writer = None
+
+    def write(self, chunk):
+        if self.schema is None:
+            self.schema = _arrow_schema(chunk)
+        table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+        self.blocks += 1
+        if self.partition_by:
+            pq.write_to_dataset(
+                table, self.target,
+                partition_cols=self.partition_by,
+                basename_template=f'part-{self.blocks}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore',
+            )
+        else:
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.target, self.schema)
+            self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _add_department_codes(codes, chunk):
+    """Acumula los COD_DEPARTAMENTO de cada nombre, para podar particiones por nombre."""
+    pairs = chunk[['DEPARTAMENTO', 'COD_DEPARTAMENTO']].drop_duplicates()
+    for name, code in pairs.itertuples(index=False):
+        codes.setdefault(str(name), set()).add(int(code))
+
+
+def ingest(path=DATA_PATH, chunksize=CHUNK_ROWS, cache_dir=None, write_rows=True,
+           layout='partitioned', by_department=False):
+    """Construye el cubo (y las filas en Parquet) recorriendo el CSV por bloques.
+
+    Devuelve el cubo. Los archivos se escriben con nombre temporal y el
+    manifiesto se registra al final, así que una ingesta interrumpida no deja
+    una caché que parezca válida.
+    """
+    if pq is None:
+        raise ImportError('La ingesta por bloques requiere pyarrow (pip install pyarrow)')
+    if layout not in LAYOUTS:
+        raise ValueError(f'Formato desconocido: {layout} (opciones: {", ".join(LAYOUTS)})')
+    parquet_path = cache.cache_paths(path, cache_dir)[0]
+    directory = cache.partition_dir(path, cache_dir)
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    partition_by = cache.PARTITION_COLS + ([cache.DEPARTMENT_PARTITION] if by_department else [])
+    partitioned = layout == 'partitioned'
+    tmp = (directory if partitioned else parquet_path) + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    writer = _RowWriter(tmp, partition_by if partitioned else None) if write_rows else None
+    cube = None
+    codes = {}
+    columns = []
+    rows = 0
+    try:
+        for number, chunk in enumerate(iter_chunks(path, chunksize), start=1):
+            part = CoverageCube.from_frame(chunk)
+            cube = part if cube is None else cube.merge(part)
+            if writer is not None:
+                writer.write(chunk)
+            _add_department_codes(codes, chunk)
+            columns = list(chunk.columns)
+            rows += len(chunk)
+            logger.info('bloque %d: %d filas acumuladas, %d celdas en el cubo', number, rows, len(cube.cells))
+    finally:
+        if writer is not None:
+            writer.close()
+    if cube is None:
+        raise ValueError(f'El archivo {path} no tiene filas')
+
+    # Las filas de una versión anterior del CSV (en cualquier formato) ya no son válidas
+    if os.path.exists(parquet_path):
+        os.remove(parquet_path)
+    shutil.rmtree(directory, ignore_errors=True)
+    if write_rows:
+        os.replace(tmp, directory if partitioned else parquet_path)
+    cache.store_cube(cube.cells, path, cache_dir, cube.sketches)
+    extra = {'rows': rows, 'cube': True, 'columns': columns}
+    if write_rows and partitioned:
+        extra.update(layout='partitioned', partition_by=partition_by)
+        if by_department:
+            extra['department_codes'] = {name: sorted(values) for name, values in codes.items()}
+    cache.write_manifest(path, cache_dir, **extra)
+    return cube
+
+
+def _replace_partitions(staging, directory):
+    """Mueve las carpetas AÑO=.../TRIMESTRE=... de `staging` sobre las de `directory`."""
+    for year in os.listdir(staging):
+        for quarter in os.listdir(os.path.join(staging, year)):
+            target = os.path.join(directory, year, quarter)
+            shutil.rmtree(target, ignore_errors=True)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(os.path.join(staging, year, quarter), target)
+    shutil.rmtree(staging)
+
+
+def _combined_version(manifest):
+    digest = hashlib.sha256(manifest['sha256'].encode())
+    for segment in manifest.get('segments', []):
+        digest.update(segment['sha256'].encode())
+    return digest.hexdigest()
+
+
+def append(path, base=DATA_PATH, chunksize=CHUNK_ROWS, cache_dir=None):
+    """Agrega el CSV de uno o más trimestres a la caché ya ingerida de `base`.
+
+    Si el archivo trae particiones que ya existen, las reemplaza. Devuelve el
+    cubo actualizado; un archivo ya agregado (mismo hash) no se procesa de nuevo.
+    """
+    if pq is None:
+        raise ImportError('La ingesta por bloques requiere pyarrow (pip install pyarrow)')
+    manifest = cache.valid_manifest(base, cache_dir)
+    if manifest is None:
+        raise ValueError(f'No hay una caché válida para {base}: ejecute primero la ingesta completa')
+    cells = cache.read_cube(base, cache_dir)
+    if cells is None:
+        # Caché creada por el dashboard, sin cubo guardado: se calcula una vez
+        cube = CoverageCube.from_frame(normalize(cache.read_rows(base, cache_dir=cache_dir)))
+    else:
+        cube = CoverageCube(cells, cache.read_sketches(base, cache_dir))
+    digest = cache.file_hash(path)
+    if any(segment['sha256'] == digest for segment in manifest.get('segments', [])):
+        logger.info('%s ya estaba agregado', path)
+        return cube
+
+    partitioned = manifest.get('layout') == 'partitioned'
+    if partitioned:
+        # Las particiones nuevas se escriben aparte y luego sustituyen a las existentes
+        segment = None
+        tmp = cache.partition_dir(base, cache_dir) + '.append'
+        shutil.rmtree(tmp, ignore_errors=True)
+        writer = _RowWriter(tmp, manifest['partition_by'])
+    else:
+        segment = cache.segment_path(base, digest, cache_dir)
+        tmp = segment + '.tmp'
+        writer = _RowWriter(tmp)
+    update = None
+    codes = {}
+    rows = 0
+    try:
+        for chunk in iter_chunks(path, chunksize):
+            part = CoverageCube.from_frame(chunk)
+            update = part if update is None else update.merge(part)
+            writer.write(chunk)
+            _add_department_codes(codes, chunk)
+            rows += len(chunk)
+    finally:
+        writer.close()
+    if update is None:
+        raise ValueError(f'El archivo {path} no tiene filas')
+    if partitioned:
+        _replace_partitions(tmp, cache.partition_dir(base, cache_dir))
+    else:
+        os.replace(tmp, segment)
+
+    partitions = update.cells[['AÑO', 'TRIMESTRE']].drop_duplicates().to_numpy().tolist()
+    cube = cube.replace(update)
+    cache.store_cube(cube.cells, base, cache_dir, cube.sketches)
+    if 'department_codes' in manifest:
+        known = manifest['department_codes']
+        for name, values in codes.items():
+            known[name] = sorted(set(known.get(name, [])) | values)
+    manifest.setdefault('segments', []).append({
+        'file': None if segment is None else os.path.basename(segment),
+        'source': os.path.abspath(path),
+        'sha256': digest,
+        'rows': rows,
+        'partitions': sorted(partitions),
+    })
+    manifest['rows'] = cube.count()
+    manifest['cube'] = True
+    manifest['version'] = _combined_version(manifest)
+    cache.save_manifest(base, manifest, cache_dir)
+    logger.info('%s: %d filas en las particiones %s', path, rows, sorted(partitions))
+    return cube
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ingesta por bloques del CSV de cobertura móvil')
+    parser.add_argument('path', nargs='?', default=DATA_PATH, help='CSV de origen')
+    parser.add_argument('--append', metavar='CSV', default=None,
+                        help='agregar el CSV de un trimestre nuevo a la caché ya ingerida de `path`')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help='filas por bloque')
+    parser.add_argument('--cache-dir', default=None, help=f'carpeta de la caché (por defecto .cache/ o ${cache.CACHE_DIR_ENV})')
+    parser.add_argument('--no-rows', action='store_true', help='guardar solo el cubo, sin el Parquet de filas')
+    parser.add_argument('--layout', choices=LAYOUTS, default='partitioned',
+                        help='filas particionadas por AÑO/TRIMESTRE o en un único Parquet')
+    parser.add_argument('--by-department', action='store_true',
+                        help='particionar también por COD_DEPARTAMENTO')
+    parser.add_argument('-v', '--verbose', action='store_true', help='mostrar el avance de cada bloque')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(message)s')
+
+    start = time.perf_counter()
+    if args.append:
+        cube = append(args.append, base=args.path, chunksize=args.chunksize, cache_dir=args.cache_dir)
+    else:
+        cube = ingest(args.path, chunksize=args.chunksize, cache_dir=args.cache_dir, write_rows=not args.no_rows,
+                      layout=args.layout, by_department=args.by_department)
+    elapsed = time.perf_counter() - start
+    print(f'Registros: {cube.count():,}')
+    print(f'Celdas del cubo: {len(cube.cells):,}')
+    if not args.no_rows and not args.append:
+        rows_path = (cache.partition_dir(args.path, args.cache_dir) if args.layout == 'partitioned'
+                     else cache.cache_paths(args.path, args.cache_dir)[0])
+        print(f'Filas: {rows_path}')
+    print(f'Cubo: {cache.cube_path(args.path, args.cache_dir)}')
+    print(f'Versión: {cache.source_version(args.path, args.cache_dir)[:16]}')
+    print(f'Tiempo: {elapsed:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Carga tipada del CSV de cobertura móvil.
+
+Define el esquema explícito de las 27 columnas y normaliza los tipos al leer:
+las columnas SÍ/NO de cobertura pasan a booleanos, los nombres a `category`,
+los códigos y años a enteros pequeños y los indicadores a float32. Una columna
+entera con celdas vacías queda como entero anulable del mismo tamaño
+(`Int16`, ...) en lugar de fallar la lectura.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from cobertura import cache
+
+DATA_PATH = 'cobertura_colombia_2017_2024_limpio_V2.csv'
+DATA_ENV = 'COBERTURA_DATA_PATH'
+
+# Columnas de cobertura por tecnología (SÍ/NO en el CSV, bool en memoria)
+COVERAGE_COLS = [
+    'COBERTURA_2G',
+    'COBERTURA_3G',
+    'COBERTURA_HSPA_HSPA_DC',
+    'COBERTURA_4G',
+    'COBERTURA_LTE',
+    'COBERTURA_5G',
+]
+
+# Columnas de texto con pocos valores distintos
+CATEGORY_COLS = [
+    'PROVEEDOR',
+    'DEPARTAMENTO',
+    'MUNICIPIO',
+    'CABECERA_MUNICIPAL',
+    'CENTRO_POBLADO',
+    'NOMBRE_PROVEEDOR_COMERCIAL',
+]
+
+# Enteros con el tipo más pequeño que cubre su rango (anulable si la columna tiene vacíos)
+INTEGER_DTYPES = {
+    'AÑO': 'int16',
+    'TRIMESTRE': 'int8',
+    'COD_DEPARTAMENTO': 'int8',
+    'COD_MUNICIPIO': 'int32',
+    'COD_CENTRO_POBLADO': 'int32',
+    'ESTRATO_PROMEDIO': 'int8',
+    'INGRESO_PROMEDIO_HOGAR': 'int32',
+    'ALTITUD_MSNM': 'int16',
+    'INV_PUBLICA_PER_CAPITA': 'int32',
+}
+
+# Indicadores socioeconómicos y geográficos continuos
+FLOAT_COLS = [
+    'TASA_POBREZA',
+    'INDICE_NBI',
+    'TASA_DESEMPLEO',
+    'TASA_ELECTRIFICACION',
+    'PCT_HOGARES_INTERNET',
+    'PRECIPITACION_MEDIA',
+]
+
+COLUMNS = [
+    'AÑO', 'TRIMESTRE', 'PROVEEDOR', 'COD_DEPARTAMENTO', 'DEPARTAMENTO',
+    'COD_MUNICIPIO', 'MUNICIPIO', 'CABECERA_MUNICIPAL', 'COD_CENTRO_POBLADO',
+    'CENTRO_POBLADO', *COVERAGE_COLS, 'ESTRATO_PROMEDIO',
+    'INGRESO_PROMEDIO_HOGAR', 'TASA_POBREZA', 'INDICE_NBI', 'TASA_DESEMPLEO',
+    'TASA_ELECTRIFICACION', 'PCT_HOGARES_INTERNET', 'ALTITUD_MSNM',
+    'PRECIPITACION_MEDIA', 'INV_PUBLICA_PER_CAPITA', 'NOMBRE_PROVEEDOR_COMERCIAL',
+]
+
+TRUE_VALUE = 'SÍ'
+FALSE_VALUE = 'NO'
+
+
+def nullable(dtype):
+    """Entero anulable de pandas del mismo tamaño: `int16` -> `Int16`."""
+    return dtype.capitalize()
+
+
+def csv_dtypes(columns=None):
+    """Tipos que `pd.read_csv` puede aplicar directamente al parsear."""
+    dtypes = {col: 'category' for col in CATEGORY_COLS}
+    # Anulables al parsear: una celda vacía no hace fallar la lectura; normalize() compacta
+    dtypes.update({col: nullable(dtype) for col, dtype in INTEGER_DTYPES.items()})
+    dtypes.update({col: 'float32' for col in FLOAT_COLS})
+    # Las columnas SÍ/NO se leen como categoría y se convierten en normalize()
+    dtypes.update({col: 'category' for col in COVERAGE_COLS})
+    if columns is not None:
+        dtypes = {col: dtype for col, dtype in dtypes.items() if col in columns}
+    return dtypes
+
+
+def _check_flags(name, values):
+    unknown = sorted(set(map(str, values)) - {TRUE_VALUE, FALSE_VALUE})
+    if unknown:
+        raise ValueError(f'{name}: valores distintos de {TRUE_VALUE}/{FALSE_VALUE}: {", ".join(unknown[:10])}')
+
+
+def _to_bool(values):
+    """Convierte una columna SÍ/NO en booleanos sin pasar por objetos Python.
+
+    Una celda vacía cuenta como sin cobertura; cualquier otro valor (`SI`,
+    `True`, ...) es un error, no un NO.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        _check_flags(values.name, values.cat.categories)
+        # El último elemento atiende el código -1: faltante equivale a sin cobertura
+        lookup = np.append(values.cat.categories == TRUE_VALUE, False)
+        result = lookup[values.cat.codes.to_numpy()]
+        return pd.Series(result, index=values.index, name=values.name)
+    _check_flags(values.name, values.dropna().unique())
+    return values.eq(TRUE_VALUE)
+
+
+def normalize(df):
+    """Aplica el esquema a un DataFrame ya leído (completo o un bloque)."""
+    for col in COVERAGE_COLS:
+        if col in df.columns and df[col].dtype != bool:
+            df[col] = _to_bool(df[col])
+    for col in CATEGORY_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+        elif col in df.columns and not df[col].cat.categories.is_monotonic_increasing:
+            # Parquet escrito por bloques une los diccionarios en orden de aparición
+            df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+    for col, dtype in INTEGER_DTYPES.items():
+        if col not in df.columns:
+            continue
+        if df[col].isna().any():
+            if df[col].dtype != nullable(dtype):
+                df[col] = df[col].astype(nullable(dtype))
+        elif df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    for col in FLOAT_COLS:
+        if col in df.columns and df[col].dtype != 'float32':
+            df[col] = df[col].astype('float32')
+    return df
+
+
+def denormalize(df):
+    """Columnas de cobertura de vuelta a SÍ/NO, para escribir un CSV que `read_csv` pueda leer."""
+    flags = [col for col in COVERAGE_COLS if col in df.columns and df[col].dtype == bool]
+    if not flags:
+        return df
+    return df.assign(**{col: np.where(df[col].to_numpy(), TRUE_VALUE, FALSE_VALUE) for col in flags})
+
+
+def data_path():
+    """CSV de los dashboards: `COBERTURA_DATA_PATH` si está definida, si no `DATA_PATH`."""
+    return os.environ.get(DATA_ENV) or DATA_PATH
+
+
+def read_csv(path=DATA_PATH, columns=None, **kwargs):
+    """Lee el CSV con el esquema tipado y devuelve el DataFrame normalizado."""
+    df = pd.read_csv(path, usecols=columns, dtype=csv_dtypes(columns), **kwargs)
+    return normalize(df)
+
+
+def load_dataset(path=DATA_PATH, columns=None, use_cache=True):
+    """Punto de entrada de los dashboards para obtener los datos tipados.
+
+    Con `use_cache` (y pyarrow instalado) el CSV se convierte una sola vez a
+    Parquet; las cargas siguientes leen solo las columnas pedidas.
+    """
+    if not use_cache or not cache.available():
+        return read_csv(path, columns=columns)
+    cached = cache.read_rows(path, columns=columns)
+    if cached is not None:
+        return normalize(cached)
+    df = read_csv(path)
+    try:
+        cache.store(df, path)
+    except OSError:
+        # Sin permisos de escritura: se sigue trabajando con el CSV
+        pass
+    return df if columns is None else df[list(columns)]
+
+
+def observed_counts(values):
+    """`value_counts` que omite las categorías sin filas en la selección."""
+    counts = values.value_counts()
+    return counts[counts > 0]
@@ -0,0 +1,193 @@
+"""Memoización con tamaño acotado y expiración (LRU + TTL).
+
+Las funciones decoradas con `memoize` se identifican por sus argumentos
+"congelados": los diccionarios de filtros y las listas se convierten en
+tuplas, el dataset se representa por su versión y las tablas de pandas por un
+hash de su contenido, así que el resultado solo se recalcula cuando cambian
+los datos o la selección. En las llamadas `(dataset, selección, ...)` el
+dataset se representa solo por las particiones que toca la selección
+(`Dataset.selection_key`): agregar un trimestre no invalida las vistas de
+otros años. Cada caché lleva
+contadores de aciertos y fallos para el panel de depuración.
+
+Los resultados se comparten entre sesiones: quien los recibe no debe
+modificarlos en el lugar.
+
+`preload` carga resultados calculados en otro proceso (ver
+`cobertura.precompute`): cuando una caché no tiene la clave, `memoize` la
+busca ahí antes de calcular.
+"""
+
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cobertura import profiling
+
+DEFAULT_MAXSIZE = 64
+DEFAULT_TTL = 1800
+
+_registry = {}
+# Cachés creadas por `memoize`, las únicas que `snapshot` guarda
+_memoized = {}
+# Resultados precalculados: nombre de caché -> {clave: valor}
+_preloaded = {}
+_MISSING = object()
+
+
+def content_hash(obj):
+    """Hash del contenido (índice, valores y nombres) de una Series o DataFrame."""
+    hashed = pd.util.hash_pandas_object(obj, index=True).to_numpy()
+    names = tuple(obj.columns) if isinstance(obj, pd.DataFrame) else obj.name
+    digest = hashlib.blake2b(hashed.tobytes(), digest_size=16)
+    digest.update(repr((obj.shape, names, obj.index.names)).encode())
+    return digest.hexdigest()
+
+
+def freeze(value):
+    """Convierte argumentos en una clave hashable y estable."""
+    cache_key = getattr(value, 'cache_key', None)
+    if cache_key is not None:
+        return cache_key
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return (type(value).__name__, content_hash(value))
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((freeze(item) for item in value), key=repr))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class TTLCache:
+    """Caché LRU con expiración por antigüedad y contadores de uso."""
+
+    def __init__(self, name, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.preloaded = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Devuelve `(True, valor)` si la clave está vigente, si no `(False, None)`."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl is None or time.monotonic() - stored_at <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+                self.evictions += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        """Copia de las entradas vigentes como `{clave: valor}`."""
+        now = time.monotonic()
+        with self._lock:
+            return {key: value for key, (stored_at, value) in self._data.items()
+                    if self.ttl is None or now - stored_at <= self.ttl}
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'cache': self.name,
+            'entradas': len(self._data),
+            'aciertos': self.hits,
+            'fallos': self.misses,
+            'desalojos': self.evictions,
+            'precalculados': self.preloaded,
+            'tasa_aciertos_%': round(self.hits / total * 100, 1) if total else 0.0,
+        }
+
+
+def call_key(args, kwargs):
+    """Clave de una llamada memoizada."""
+    if len(args) >= 2 and hasattr(args[0], 'selection_key'):
+        args = (args[0].selection_key(args[1]), *args[1:])
+    return (freeze(args), freeze(kwargs))
+
+
+def register(cache):
+    """Incluye una `TTLCache` propia en `cache_stats` y `clear_caches`."""
+    _registry[cache.name] = cache
+    return cache
+
+
+def memoize(maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+    """Decorador que guarda los resultados en una `TTLCache` registrada.
+
+    La caché se llama `módulo.función` (p. ej. `charts.bar`), que es también el
+    nombre del tramo en `cobertura.profiling`.
+    """
+    def decorator(func):
+        name = f'{func.__module__.rsplit(".", 1)[-1]}.{func.__qualname__}'
+        cache = register(TTLCache(name, maxsize=maxsize, ttl=ttl))
+        _memoized[name] = cache
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiling.span(name):
+                key = call_key(args, kwargs)
+                found, value = cache.get(key)
+                if found:
+                    return value
+                value = _preloaded.get(name, {}).get(key, _MISSING)
+                if value is _MISSING:
+                    value = func(*args, **kwargs)
+                else:
+                    cache.preloaded += 1
+                cache.put(key, value)
+                return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Contadores de todas las cachés registradas."""
+    return [cache.stats() for cache in _registry.values()]
+
+
+def clear_caches():
+    for cache in _registry.values():
+        cache.clear()
+
+
+def snapshot():
+    """Entradas vigentes de las cachés de `memoize`: `{caché: {clave: valor}}`."""
+    return {name: cache.items() for name, cache in _memoized.items()}
+
+
+def preload(entries):
+    """Usa `entries` (como las devuelve `snapshot`) cuando una caché no tiene la clave."""
+    global _preloaded
+    _preloaded = entries
@@ -0,0 +1,71 @@
+"""Control del pico de memoria asignado en cada rerun de Streamlit.
+
+Se activa con la variable de entorno `COBERTURA_MEMORY_GUARD=1`. Usa
+`tracemalloc`, que también contabiliza los buffers de NumPy y pandas. Si se
+define `COBERTURA_MEMORY_LIMIT_MB`, los reruns que la superen se registran como
+advertencia para detectar regresiones.
+
+`tracemalloc` mide todo el proceso: con varias sesiones ejecutándose a la vez
+el pico incluye lo que asignan las demás.
+"""
+
+import logging
+import os
+import tracemalloc
+
+from cobertura import profiling
+
+GUARD_ENV = 'COBERTURA_MEMORY_GUARD'
+LIMIT_ENV = 'COBERTURA_MEMORY_LIMIT_MB'
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryGuard:
+    """Mide el pico de memoria entre `start()` y `stop()`."""
+
+    def __init__(self, enabled=True, limit_mb=None, label='rerun'):
+        self.enabled = enabled
+        self.limit_mb = limit_mb
+        self.label = label
+        self.peak_mb = None
+        self._baseline = 0
+
+    @classmethod
+    def from_env(cls, label='rerun'):
+        enabled = os.environ.get(GUARD_ENV, '').lower() in ('1', 'true', 'yes')
+        limit = os.environ.get(LIMIT_ENV)
+        return cls(enabled=enabled, limit_mb=float(limit) if limit else None, label=label)
+
+    @property
+    def exceeded(self):
+        return self.limit_mb is not None and self.peak_mb is not None and self.peak_mb > self.limit_mb
+
+    def start(self):
+        if not self.enabled:
+            return self
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def stop(self):
+        """Devuelve el pico en MB por encima de la memoria viva al iniciar."""
+        if not self.enabled:
+            return None
+        # La instrumentación por sección reinicia el pico en cada tramo y guarda el máximo
+        peak = max(tracemalloc.get_traced_memory()[1], profiling.peak_bytes())
+        self.peak_mb = max(peak - self._baseline, 0) / 2**20
+        if self.exceeded:
+            logger.warning('%s: pico de memoria %.1f MB supera el límite de %.1f MB',
+                           self.label, self.peak_mb, self.limit_mb)
+        else:
+            logger.info('%s: pico de memoria %.1f MB', self.label, self.peak_mb)
+        return self.peak_mb
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,95 @@
+"""Motor de reducciones agrupadas para las métricas de cobertura.
+
+Calcula todas las tecnologías para todos los grupos en una sola pasada, ya sea
+sumando celdas del cubo (cuando las claves son dimensiones del cubo) o con un
+único `groupby` sobre las columnas booleanas de las filas.
+"""
+
+import pandas as pd
+
+from cobertura.cube import DIMENSIONS, CoverageCube
+
+# Etiqueta corta de cada tecnología -> columna del dataset
+TECHNOLOGIES = {
+    '2G': 'COBERTURA_2G',
+    '3G': 'COBERTURA_3G',
+    'HSPA_HSPA_DC': 'COBERTURA_HSPA_HSPA_DC',
+    '4G': 'COBERTURA_4G',
+    'LTE': 'COBERTURA_LTE',
+    '5G': 'COBERTURA_5G',
+}
+
+# Tecnologías que muestran los heatmaps y las series de tiempo
+MAIN_TECHNOLOGIES = ['2G', '3G', '4G', 'LTE', '5G']
+
+
+def _keys(by):
+    if by is None:
+        return []
+    return [by] if isinstance(by, str) else list(by)
+
+
+def _use_cube(source, by):
+    return isinstance(source, CoverageCube) and all(key in DIMENSIONS for key in _keys(by))
+
+
+def coverage_by(source, by=None, techs=MAIN_TECHNOLOGIES, where=None, tidy=False):
+    """Porcentaje de cobertura por grupo y tecnología.
+
+    `source` puede ser el cubo de agregados (con `where` como filtro) o un
+    DataFrame ya filtrado. Devuelve una tabla ancha indexada por `by` con una
+    columna por tecnología, o en formato largo (`by`, Tecnología, Cobertura_%)
+    si `tidy` es verdadero. Sin `by` devuelve una Serie con el total.
+
+    Sobre las filas es un `groupby().mean()` nativo de las columnas booleanas:
+    no hay llamadas Python por grupo.
+    """
+    columns = [TECHNOLOGIES[tech] for tech in techs]
+    if _use_cube(source, by):
+        result = source.coverage(columns, by=by, where=where)
+    elif not _keys(by):
+        result = source[columns].mean() * 100
+    else:
+        result = source.groupby(by, observed=True)[columns].mean() * 100
+    return _relabel(result, techs, tidy, 'Cobertura_%')
+
+
+def coverage_counts(source, by=None, techs=MAIN_TECHNOLOGIES, where=None, tidy=False):
+    """Número de registros con cobertura por grupo y tecnología."""
+    columns = [TECHNOLOGIES[tech] for tech in techs]
+    if _use_cube(source, by):
+        state = source.rollup(by, where, columns)
+        result = state[columns]
+    elif not _keys(by):
+        result = source[columns].sum()
+    else:
+        result = source.groupby(by, observed=True)[columns].sum()
+    return _relabel(result.astype('int64'), techs, tidy, 'Localidades')
+
+
+def _relabel(result, techs, tidy, value_name):
+    if isinstance(result, pd.Series):
+        result.index = list(techs)
+        return result
+    result.columns = list(techs)
+    if tidy:
+        return to_tidy(result, 'Tecnología', value_name)
+    return result
+
+
+def mean_by(source, by, columns, where=None):
+    """Media de indicadores por grupo, desde el cubo o desde las filas."""
+    if _use_cube(source, by):
+        return source.mean(list(columns), by=by, where=where)
+    if not _keys(by):
+        return source[list(columns)].mean()
+    return source.groupby(by, observed=True)[list(columns)].mean()
+
+
+def to_tidy(wide, var_name, value_name):
+    """Pasa una tabla ancha (grupo × variable) a formato largo para graficar."""
+    return wide.reset_index().melt(
+        id_vars=list(wide.index.names),
+        var_name=var_name,
+        value_name=value_name,
+    )
@@ -0,0 +1,76 @@
+"""Pool de hilos compartido para agregaciones parciales por bloque de filas.
+
+Las agregaciones grandes (el cubo al cargar los datos, las medias por grupo y
+los municipios por departamento sobre las filas) se dividen en bloques
+contiguos de filas, cada bloque produce un agregado parcial y los parciales
+se combinan. Los bloques son vistas `iloc` del DataFrame, sin copia.
+
+Hay un único pool por proceso, compartido por todas las sesiones de
+Streamlit y limitado a `COBERTURA_WORKERS` hilos (por defecto, los núcleos
+de la máquina): con muchos usuarios a la vez las tareas esperan turno en
+lugar de sobrescribir la CPU. Los núcleos de numpy, pandas y pyarrow que
+hacen el trabajo liberan el GIL, así que los hilos corren en paralelo sin
+copiar los datos a otros procesos.
+"""
+
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+WORKERS_ENV = 'COBERTURA_WORKERS'
+
+# Por debajo de este tamaño de bloque el reparto cuesta más de lo que ahorra
+MIN_BLOCK_ROWS = 250_000
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def workers():
+    """Hilos del pool compartido (`COBERTURA_WORKERS` o los núcleos disponibles)."""
+    value = os.environ.get(WORKERS_ENV)
+    if value:
+        return max(1, int(value))
+    return os.cpu_count() or 1
+
+
+def _shared_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=workers(), thread_name_prefix='cobertura')
+        return _pool
+
+
+def _run_task(func, item):
+    _local.inside = True
+    try:
+        return func(item)
+    finally:
+        _local.inside = False
+
+
+def run(func, items):
+    """`[func(item) for item in items]`, en el pool si vale la pena.
+
+    Dentro de una tarea del pool se ejecuta en línea: esperar a otras tareas
+    del mismo pool podría bloquearlo si todos los hilos están ocupados.
+    """
+    items = list(items)
+    if len(items) <= 1 or workers() == 1 or getattr(_local, 'inside', False):
+        return [func(item) for item in items]
+    return list(_shared_pool().map(_run_task, [func] * len(items), items))
+
+
+def row_blocks(frame, min_rows=MIN_BLOCK_ROWS):
+    """Bloques contiguos de filas (vistas sin copia), uno por hilo como máximo."""
+    count = max(1, min(workers(), len(frame) // min_rows))
+    size = math.ceil(len(frame) / count) if len(frame) else 0
+    return [frame.iloc[start:start + size] for start in range(0, len(frame), size)] if size else [frame]
+
+
+def map_blocks(func, frame, min_rows=MIN_BLOCK_ROWS):
+    """Agregados parciales de `func` sobre cada bloque de filas de `frame`."""
+    return run(func, row_blocks(frame, min_rows))
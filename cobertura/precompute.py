@@ -0,0 +1,186 @@
+"""Precálculo de los agregados y figuras de las vistas más consultadas.
+
+Después de cada actualización de los datos (ingesta completa o `--append`):
+
+    python -m cobertura.precompute
+
+ejecuta ambos dashboards sin navegador (`streamlit.testing`) en la vista
+inicial y en cada selección de un solo año, un solo departamento y un solo
+proveedor, recorre todas sus secciones y guarda lo que quedó en las cachés de
+`memo.memoize` (agregados, figuras de Plotly e imágenes) en
+`<nombre>.precomputed.pkl`, junto a la caché del CSV. Los dashboards llaman
+a `load` al cargar el dataset: el primer rerun de esas vistas toma los
+resultados del archivo en lugar de calcularlos. Las figuras se guardan como su
+JSON de Plotly (reconstruir cientos de `Figure` validadas al leer el archivo
+tomaría segundos) y se arman sin validar solo cuando se piden.
+
+Las claves son las de `memo` (`Dataset.selection_key`): después de agregar un
+trimestre siguen valiendo los resultados de las selecciones que no lo
+incluyen (p. ej. un solo año anterior); los demás se calculan en el rerun. El
+archivo guarda la versión del CSV base y se ignora si ese CSV cambia. Es un pickle escrito por este mismo
+proyecto en la carpeta de caché local: no debe cargarse uno de otro origen.
+`COBERTURA_PRECOMPUTED=0` desactiva la carga.
+"""
+
+import argparse
+import logging
+import os
+import pickle
+import time
+
+from cobertura import cache, memo
+from cobertura.dataset import Dataset
+from cobertura.loader import DATA_ENV, data_path
+
+PRECOMPUTED_ENV = 'COBERTURA_PRECOMPUTED'
+
+DASHBOARDS = ['dashboard_cobertura.py', 'dashboard_simple.py']
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Etiquetas de los filtros de la barra lateral de cada dashboard (selectbox / multiselect)
+FILTER_LABELS = {
+    'dashboard_cobertura.py': {
+        'year': "📅 Seleccionar Año:",
+        'department': "🏛️ Seleccionar Departamento:",
+        'provider': "📡 Seleccionar Proveedor:",
+    },
+    'dashboard_simple.py': {
+        'year': "Seleccionar Años:",
+        'department': "Seleccionar Departamentos:",
+        'provider': "Seleccionar Proveedores:",
+    },
+}
+
+logger = logging.getLogger(__name__)
+
+
+class _Results:
+    """Resultados de una caché; las figuras se reconstruyen desde su JSON al pedirlas."""
+
+    def __init__(self, values, figures):
+        self.values = values
+        self.figures = figures
+
+    def get(self, key, default=None):
+        if key in self.figures:
+            import plotly.graph_objects as go
+            # La figura ya se validó cuando se construyó en el trabajo de precálculo
+            return go.Figure(self.figures[key], _validate=False)
+        return self.values.get(key, default)
+
+
+def _encode(entries):
+    """`{caché: (valores, figuras)}`, con las figuras como JSON de Plotly."""
+    encoded = {}
+    for name, items in entries.items():
+        figures = {key: value.to_plotly_json() for key, value in items.items() if hasattr(value, 'to_plotly_json')}
+        values = {key: value for key, value in items.items() if key not in figures}
+        if items:
+            encoded[name] = (values, figures)
+    return encoded
+
+
+def enabled():
+    return os.environ.get(PRECOMPUTED_ENV, '').lower() not in ('0', 'false', 'no')
+
+
+def views(dataset):
+    """`{nombre: (filtro, valor)}`: la vista inicial y cada selección de un solo valor."""
+    result = {'inicial': None}
+    for dimension, values in (('year', dataset.years), ('department', dataset.departments),
+                              ('provider', dataset.providers)):
+        for value in values:
+            value = value.item() if hasattr(value, 'item') else value
+            result[f'{dimension}={value}'] = (dimension, value)
+    return result
+
+
+def _apply(app, script, view):
+    """Fija en la barra lateral el único filtro de la vista; el resto queda por defecto."""
+    if view is None:
+        return
+    dimension, value = view
+    label = FILTER_LABELS[script][dimension]
+    for widget in (*app.selectbox, *app.multiselect):
+        if widget.label == label:
+            widget.set_value([value] if widget.type == 'multiselect' else value)
+            return
+    raise LookupError(f'{script}: no se encontró el filtro "{label}"')
+
+
+def run(dataset, scripts=DASHBOARDS, timeout=120):
+    """Ejecuta cada dashboard en cada vista y sección; devuelve las entradas de las cachés."""
+    from streamlit.testing.v1 import AppTest
+
+    entries = {}
+    for script in scripts:
+        for name, view in views(dataset).items():
+            started = time.perf_counter()
+            app = AppTest.from_file(os.path.join(ROOT, script), default_timeout=timeout).run()
+            _apply(app, script, view)
+            app.run()
+            radios = [radio for radio in app.radio if radio.key == 'section']
+            for option in radios[0].options[1:] if radios else []:
+                app.radio(key='section').set_value(option).run()
+            if app.exception:
+                raise RuntimeError(f'{script} ({name}): {app.exception[0].value}')
+            # Las cachés son LRU acotadas: se copian después de cada vista
+            for cache_name, items in memo.snapshot().items():
+                entries.setdefault(cache_name, {}).update(items)
+            logger.info('%s %s: %.1f s', script, name, time.perf_counter() - started)
+    return entries
+
+
+def save(dataset, entries, cache_dir=None):
+    path = cache.precomputed_path(dataset.source, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as target:
+        # La versión del CSV base va primero para descartar un archivo viejo sin leer los resultados
+        pickle.dump(dataset.base_version, target, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(_encode(entries), target, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+def load(dataset, cache_dir=None):
+    """Carga en `memo` los resultados precalculados si corresponden al CSV base del dataset."""
+    if not enabled() or dataset.source is None:
+        return False
+    path = cache.precomputed_path(dataset.source, cache_dir)
+    if not os.path.exists(path):
+        return False
+    with open(path, 'rb') as source:
+        if pickle.load(source) != dataset.base_version:
+            logger.info('%s corresponde a otro CSV de origen; se ignora', path)
+            return False
+        entries = pickle.load(source)
+    memo.preload({name: _Results(values, figures) for name, (values, figures) in entries.items()})
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precalcula los agregados y figuras de las vistas frecuentes.')
+    parser.add_argument('--data', help='CSV de origen (por defecto COBERTURA_DATA_PATH o el CSV del proyecto)')
+    parser.add_argument('--dashboard', action='append', choices=DASHBOARDS,
+                        help='Dashboard a precalcular (se puede repetir; por defecto ambos)')
+    parser.add_argument('--timeout', type=float, default=120, help='Segundos máximos por rerun')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(message)s')
+
+    path = os.path.abspath(args.data or data_path())
+    # Los dashboards leen el mismo CSV y calculan todo, sin un archivo precalculado anterior
+    os.environ[DATA_ENV] = path
+    os.environ[PRECOMPUTED_ENV] = '0'
+    started = time.perf_counter()
+    dataset = Dataset.load(path)
+    entries = run(dataset, args.dashboard or DASHBOARDS, args.timeout)
+    output = save(dataset, entries)
+    total = sum(len(items) for items in entries.values())
+    print(f'{len(views(dataset))} vistas, {total} resultados -> {output} '
+          f'({os.path.getsize(output) / 2**20:.1f} MB, {time.perf_counter() - started:.0f} s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""Instrumentación por sección de cada rerun: tiempo, CPU, filas y memoria.
+
+Un rerun se divide en fases secuenciales (`phase`: carga, filtros, la sección
+elegida) y dentro de ellas en tramos anidados (`span`): `memo.memoize` abre
+uno por cada agregado y cada figura, con el nombre `módulo.función`. Por
+cada tramo se registra:
+
+- tiempo de reloj y tiempo de CPU del hilo de la sesión (`time.thread_time`;
+  no incluye el trabajo repartido en `cobertura.parallel`)
+- filas recorridas: filas de las selecciones más celdas del cubo leídas
+- pico de memoria asignada, solo si `tracemalloc` está activo
+  (`COBERTURA_PROFILE=1` lo activa, igual que `COBERTURA_MEMORY_GUARD=1`)
+
+El registro vive en el hilo que ejecuta el script, así que las sesiones
+simultáneas no se mezclan. Sin un rerun instrumentado en curso, `span` y
+`phase` devuelven un contexto vacío compartido: el costo es una consulta
+de atributo por llamada.
+
+Al terminar (`finish`) el rerun se escribe como una línea JSON en el logger
+`cobertura.profiling` y se acumula en métricas del proceso, que se exportan
+en formato de texto de Prometheus con `metrics_text()` o por HTTP con
+`serve_metrics(puerto)` (`COBERTURA_METRICS_PORT` en los dashboards).
+"""
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROFILE_ENV = 'COBERTURA_PROFILE'
+METRICS_PORT_ENV = 'COBERTURA_METRICS_PORT'
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_NOOP = contextlib.nullcontext()
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+_server = None
+_server_lock = threading.Lock()
+
+
+def env_enabled():
+    """Instrumentación activa para todas las sesiones con `COBERTURA_PROFILE=1`."""
+    return os.environ.get(PROFILE_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+class _Span:
+    """Tramo abierto; al cerrarse se convierte en un registro del rerun."""
+
+    def __init__(self, profiler, name, depth):
+        self.profiler = profiler
+        self.name = name
+        self.depth = depth
+        self.rows = 0
+        self.child_peak = 0
+
+    def __enter__(self):
+        self.profiler._stack.append(self)
+        self._record = {'seccion': self.name, 'nivel': self.depth}
+        self.profiler.records.append(self._record)
+        if tracemalloc.is_tracing():
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        stack = self.profiler._stack
+        stack.pop()
+        parent = stack[-1] if stack else None
+        memory = None
+        if tracemalloc.is_tracing() and hasattr(self, '_memory_start'):
+            # El pico se reinicia en cada tramo: el del padre es el máximo de sus hijos y el suyo propio
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            memory = max(peak - self._memory_start, 0) / 2**20
+            self.profiler.peak_bytes = max(self.profiler.peak_bytes, peak)
+            if parent is not None:
+                parent.child_peak = max(parent.child_peak, peak)
+            tracemalloc.reset_peak()
+        if parent is not None:
+            parent.rows += self.rows
+        self._record.update(wall_ms=wall * 1000, cpu_ms=cpu * 1000, filas=self.rows, memoria_mb=memory)
+        return False
+
+
+class Profiler:
+    """Registros de un rerun: una fila por fase o tramo, en orden de apertura."""
+
+    def __init__(self, label):
+        self.label = label
+        self.records = []
+        self.peak_bytes = 0
+        self._stack = []
+        self._phase = None
+
+    def span(self, name):
+        return _Span(self, name, len(self._stack))
+
+    def phase(self, name):
+        """Cierra la fase anterior y abre `name` en el nivel superior."""
+        self.end_phase()
+        self._phase = self.span(name)
+        self._phase.__enter__()
+
+    def end_phase(self):
+        if self._phase is not None:
+            # Tramos que hayan quedado abiertos por una excepción
+            while self._stack and self._stack[-1] is not self._phase:
+                self._stack[-1].__exit__(None, None, None)
+            self._phase.__exit__(None, None, None)
+            self._phase = None
+
+    def add_rows(self, count):
+        if self._stack:
+            self._stack[-1].rows += int(count)
+
+
+def start(label, enabled=True):
+    """Empieza a instrumentar el rerun del hilo actual; devuelve el `Profiler` o None."""
+    _local.last_peak = 0
+    if not enabled:
+        _local.profiler = None
+        return None
+    if env_enabled() and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    profiler = Profiler(label)
+    _local.profiler = profiler
+    return profiler
+
+
+def current():
+    return getattr(_local, 'profiler', None)
+
+
+def span(name):
+    """Contexto que mide un tramo del rerun en curso (vacío si no se instrumenta)."""
+    profiler = getattr(_local, 'profiler', None)
+    return _NOOP if profiler is None else profiler.span(name)
+
+
+def phase(name):
+    profiler = getattr(_local, 'profiler', None)
+    if profiler is not None:
+        profiler.phase(name)
+
+
+def add_rows(count):
+    """Suma filas recorridas al tramo abierto."""
+    profiler = getattr(_local, 'profiler', None)
+    if profiler is not None:
+        profiler.add_rows(count)
+
+
+def peak_bytes():
+    """Mayor pico absoluto de tracemalloc visto por los tramos del rerun en curso o recién cerrado."""
+    profiler = getattr(_local, 'profiler', None)
+    return getattr(_local, 'last_peak', 0) if profiler is None else profiler.peak_bytes
+
+
+def finish():
+    """Cierra el rerun: lo registra en el log y en las métricas; devuelve sus registros."""
+    profiler = getattr(_local, 'profiler', None)
+    if profiler is None:
+        return None
+    profiler.end_phase()
+    _local.profiler = None
+    _local.last_peak = profiler.peak_bytes
+    records = profiler.records
+    logger.info(json.dumps({'rerun': profiler.label, 'secciones': records}, ensure_ascii=False))
+    with _metrics_lock:
+        for record in records:
+            totals = _metrics.setdefault(record['seccion'], {
+                'count': 0, 'wall': 0.0, 'cpu': 0.0, 'rows': 0, 'memory': 0.0,
+            })
+            totals['count'] += 1
+            totals['wall'] += record['wall_ms'] / 1000
+            totals['cpu'] += record['cpu_ms'] / 1000
+            totals['rows'] += record['filas']
+            totals['memory'] += (record['memoria_mb'] or 0) * 2**20
+    return records
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def metrics_text():
+    """Métricas acumuladas del proceso en el formato de texto de Prometheus."""
+    with _metrics_lock:
+        snapshot = {name: dict(totals) for name, totals in _metrics.items()}
+    families = [
+        ('cobertura_section_wall_seconds', 'summary', 'Tiempo de reloj por sección', 'wall'),
+        ('cobertura_section_cpu_seconds', 'summary', 'Tiempo de CPU del hilo de la sesión por sección', 'cpu'),
+        ('cobertura_section_peak_bytes', 'summary', 'Pico de memoria asignada por sección', 'memory'),
+    ]
+    lines = []
+    for metric, kind, help_text, key in families:
+        lines += [f'# HELP {metric} {help_text}.', f'# TYPE {metric} {kind}']
+        for name, totals in sorted(snapshot.items()):
+            lines.append(f'{metric}_sum{{section="{_label(name)}"}} {totals[key]:.6f}')
+            lines.append(f'{metric}_count{{section="{_label(name)}"}} {totals["count"]}')
+    lines += ['# HELP cobertura_section_rows_total Filas y celdas del cubo recorridas por sección.',
+              '# TYPE cobertura_section_rows_total counter']
+    for name, totals in sorted(snapshot.items()):
+        lines.append(f'cobertura_section_rows_total{{section="{_label(name)}"}} {totals["rows"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = metrics_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug('metrics: ' + format, *args)
+
+
+def serve_metrics(port, host='127.0.0.1'):
+    """Sirve `/metrics` en un hilo de fondo; una sola vez por proceso."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name='cobertura-metrics', daemon=True).start()
+        return _server
@@ -0,0 +1,156 @@
+"""Agregados de cada sección de los dashboards y resumen ejecutivo, sin Streamlit.
+
+`SECTIONS` enumera, por sección de `dashboard_cobertura.py`, las llamadas a
+`aggregates` que hace la vista con los mismos argumentos, así que calcular una
+sección aquí deja calientes las cachés de resultados que usará el dashboard.
+Sirve para perfilar, ejecutar en lote y precalcular sin navegador:
+
+    python -m cobertura.report --year 2024 --department ANTIOQUIA
+
+imprime el tiempo de cada sección y de cada agregado (ver `cobertura.profiling`).
+"""
+
+import argparse
+import json
+
+from cobertura import aggregates, profiling
+from cobertura.dataset import Dataset
+
+# Valor de los selectores de la barra lateral que significa "sin filtro"
+ALL = 'Todos'
+
+SOCIO_COLUMNS = ['INGRESO_PROMEDIO_HOGAR', 'TASA_POBREZA', 'TASA_DESEMPLEO', 'PCT_HOGARES_INTERNET']
+CORRELATION_COLUMNS = ['INGRESO_PROMEDIO_HOGAR', 'TASA_POBREZA', 'TASA_DESEMPLEO', 'ESTRATO_PROMEDIO',
+                       'PCT_HOGARES_INTERNET']
+ESTRATO_COLUMNS = ['INGRESO_PROMEDIO_HOGAR', 'TASA_POBREZA', 'PCT_HOGARES_INTERNET']
+NUMERIC_COLUMNS = ['ESTRATO_PROMEDIO', 'INGRESO_PROMEDIO_HOGAR', 'TASA_POBREZA', 'TASA_DESEMPLEO',
+                   'PCT_HOGARES_INTERNET', 'ALTITUD_MSNM', 'PRECIPITACION_MEDIA', 'INV_PUBLICA_PER_CAPITA']
+SUMMARY_COLUMNS = ['INGRESO_PROMEDIO_HOGAR', 'TASA_POBREZA', 'TASA_DESEMPLEO', 'PCT_HOGARES_INTERNET',
+                   'ALTITUD_MSNM', 'INV_PUBLICA_PER_CAPITA']
+
+SECTIONS = {
+    'cobertura': lambda d, s: {
+        'tecnologias': aggregates.coverage_summary(d, s),
+        'departamentos': aggregates.department_coverage(d, s, limit=10),
+    },
+    'geografico': lambda d, s: {
+        'mapa': aggregates.department_map(d, s),
+        'departamentos': aggregates.value_counts(d, s, 'DEPARTAMENTO'),
+        'cabecera': aggregates.value_counts(d, s, 'CABECERA_MUNICIPAL'),
+        'municipios': aggregates.location_bins(d, s, 'COD_MUNICIPIO', 6),
+        'altitud': aggregates.top_departments(d, s, 'ALTITUD_MSNM'),
+    },
+    'proveedor': lambda d, s: {
+        'registros': aggregates.value_counts(d, s, 'NOMBRE_PROVEEDOR_COMERCIAL'),
+        'cobertura': aggregates.provider_coverage(d, s),
+    },
+    'socioeconomico': lambda d, s: {
+        'ingreso': aggregates.top_departments(d, s, 'INGRESO_PROMEDIO_HOGAR'),
+        'pobreza': aggregates.top_departments(d, s, 'TASA_POBREZA'),
+        'desempleo': aggregates.top_departments(d, s, 'TASA_DESEMPLEO'),
+        'correlacion': aggregates.correlation(d, s, CORRELATION_COLUMNS),
+    },
+    'series': lambda d, s: {
+        'cobertura': aggregates.yearly_coverage(d, s),
+        'socioeconomico': aggregates.yearly_means(d, s, SOCIO_COLUMNS),
+    },
+    'detallado': lambda d, s: {
+        'departamentos_5g': aggregates.coverage_counts_by(d, s, 'DEPARTAMENTO', '5G', limit=10),
+        'proveedores_5g': aggregates.coverage_counts_by(d, s, 'NOMBRE_PROVEEDOR_COMERCIAL', '5G'),
+        'estrato': aggregates.estrato_means(d, s, ESTRATO_COLUMNS),
+        'descripcion': aggregates.describe(d, s, NUMERIC_COLUMNS),
+    },
+    'resumen': lambda d, s: {
+        'indicadores': key_indicators(d, s),
+        'tecnologias': aggregates.coverage_summary(d, s),
+        'medias': aggregates.summary_means(d, s, SUMMARY_COLUMNS),
+    },
+}
+
+
+def selection(year=None, department=None, provider=None):
+    """Selección común al cubo y al índice de filas a partir de los selectores.
+
+    Cada valor puede ser uno solo, una lista o `ALL`/None (sin filtro).
+    """
+    values = {'AÑO': year, 'DEPARTAMENTO': department, 'NOMBRE_PROVEEDOR_COMERCIAL': provider}
+    return {col: None if value is None or (isinstance(value, str) and value == ALL) else value
+            for col, value in values.items()}
+
+
+def key_indicators(dataset, selection, best_department=True):
+    """Indicadores del resumen ejecutivo de la selección.
+
+    Sin `best_department` no se calcula el ranking de departamentos y
+    `mejor_departamento` queda en None.
+    """
+    providers = aggregates.value_counts(dataset, selection, 'NOMBRE_PROVEEDOR_COMERCIAL')
+    ranking = aggregates.department_ranking(dataset, selection, '4G') if best_department else ()
+    return {
+        'cobertura_4g': aggregates.coverage_rate(dataset, selection, 'COBERTURA_4G'),
+        'cobertura_5g': aggregates.coverage_rate(dataset, selection, 'COBERTURA_5G'),
+        'internet': aggregates.summary_means(dataset, selection, 'PCT_HOGARES_INTERNET'),
+        'inversion': aggregates.summary_means(dataset, selection, 'INV_PUBLICA_PER_CAPITA'),
+        'proveedor_lider': (providers.index[0], int(providers.iloc[0])) if len(providers) else None,
+        'mejor_departamento': (ranking.index[0], float(ranking.iloc[0])) if len(ranking) else None,
+    }
+
+
+def findings(indicators, bold=True, best_department=True):
+    """Hallazgos en texto (markdown) a partir de `key_indicators`."""
+    def title(text):
+        return f'**{text}**' if bold else text
+
+    avg_4g, avg_5g, internet = indicators['cobertura_4g'], indicators['cobertura_5g'], indicators['internet']
+    result = []
+    if avg_4g > 70:
+        result.append(f"✅ {title('Buena cobertura 4G')}: El {avg_4g:.1f}% de las localidades tiene cobertura 4G")
+    else:
+        result.append(f"⚠️ {title('Cobertura 4G limitada')}: Solo el {avg_4g:.1f}% de las localidades tiene cobertura 4G")
+    if avg_5g > 5:
+        result.append(f"🚀 {title('Despliegue de 5G')}: El {avg_5g:.1f}% de las localidades ya tiene cobertura 5G")
+    else:
+        result.append(f"📱 {title('5G en desarrollo')}: Solo el {avg_5g:.1f}% de las localidades tiene cobertura 5G")
+    if internet < 60:
+        result.append(f"⚠️ {title('Brecha digital')}: Solo el {internet:.1f}% de los hogares tiene acceso a Internet")
+    else:
+        result.append(f"✅ {title('Buena penetración')}: El {internet:.1f}% de los hogares tiene acceso a Internet")
+    if indicators['proveedor_lider'] is not None:
+        provider, count = indicators['proveedor_lider']
+        result.append(f"🏆 {title('Proveedor líder')}: {provider} con {count:,} registros")
+    if best_department and indicators['mejor_departamento'] is not None:
+        department, coverage = indicators['mejor_departamento']
+        result.append(f"🌟 {title('Mejor departamento')}: {department} con {coverage:.1f}% de cobertura 4G")
+    return result
+
+
+def compute(dataset, selection, sections=None):
+    """Resultados de las secciones pedidas (todas por defecto), por nombre."""
+    names = list(SECTIONS) if sections is None else list(sections)
+    results = {}
+    for name in names:
+        with profiling.span(f'sección: {name}'):
+            results[name] = SECTIONS[name](dataset, selection)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Calcula las secciones del dashboard sin Streamlit.')
+    parser.add_argument('--data', help='CSV de origen (por defecto COBERTURA_DATA_PATH o el CSV del proyecto)')
+    parser.add_argument('--year', type=int)
+    parser.add_argument('--department')
+    parser.add_argument('--provider')
+    parser.add_argument('--section', action='append', choices=list(SECTIONS),
+                        help='Sección a calcular (se puede repetir; por defecto todas)')
+    args = parser.parse_args(argv)
+
+    profiling.start('report')
+    with profiling.span('carga'):
+        dataset = Dataset.load(args.data)
+    compute(dataset, selection(args.year, args.department, args.provider), args.section)
+    for record in profiling.finish():
+        print(json.dumps(record, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Filas normalizadas en un archivo Arrow mapeado en memoria, compartido entre procesos.
+
+`st.cache_resource` ya entrega el mismo `Dataset` a todas las sesiones de un
+proceso; este módulo hace que además varios procesos (varios servidores de
+Streamlit en la misma máquina, workers de la ingesta) usen una sola copia de
+las filas. El DataFrame normalizado se escribe una vez como Arrow IPC sin
+comprimir en `<nombre>.arrow` y cada proceso lo mapea con `pa.memory_map`:
+las páginas viven en la caché del sistema operativo y se comparten.
+
+Las columnas se guardan ya en su representación de pandas (booleanos como
+bytes, categorías como códigos más la lista de categorías en los metadatos),
+así que el DataFrame se arma sobre los buffers mapeados sin copiar nada. Los
+arreglos son de solo lectura; una escritura en pandas copia la columna
+(copy-on-write) sin tocar el archivo.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from cobertura import cache
+from cobertura.loader import DATA_PATH, load_dataset
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow es opcional
+    pa = None
+
+METADATA_KEY = b'cobertura'
+
+
+def _mask(col):
+    """Columna con la máscara de vacíos de un entero anulable."""
+    return f'{col}__vacios'
+
+
+def _column(values):
+    """Arreglo de numpy con la representación en memoria de la columna y su descripción."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), {'kind': 'category', 'categories': list(values.cat.categories)}
+    if isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+        # Entero anulable (Int16, ...): los valores con los vacíos en 0; la máscara va en `_mask`
+        data = values.to_numpy(dtype=values.dtype.numpy_dtype, na_value=0)
+        return data, {'kind': 'nullable', 'mask': _mask(values.name)}
+    array = values.to_numpy()
+    if array.dtype == np.bool_:
+        return array.view(np.uint8), {'kind': 'bool'}
+    return array, {'kind': 'plain'}
+
+
+def export(frame, path, version):
+    """Escribe `frame` como Arrow IPC sin comprimir, con nombre temporal y `os.replace`."""
+    arrays, columns = {}, {}
+    for col in frame.columns:
+        arrays[col], columns[col] = _column(frame[col])
+        if columns[col]['kind'] == 'nullable':
+            arrays[_mask(col)] = frame[col].isna().to_numpy().view(np.uint8)
+    metadata = {'version': version, 'columns': columns}
+    table = pa.table({col: pa.array(values) for col, values in arrays.items()})
+    table = table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata, ensure_ascii=False)})
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+
+def attach(path, version=None):
+    """DataFrame de solo lectura sobre el archivo mapeado, o None si falta o es de otra versión."""
+    if not os.path.exists(path):
+        return None
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    metadata = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b'{}'))
+    if version is not None and metadata.get('version') != version:
+        return None
+    data = {}
+    for col, spec in metadata['columns'].items():
+        column = table.column(col)
+        chunk = column.chunks[0] if column.num_chunks == 1 else column.combine_chunks()
+        values = chunk.to_numpy(zero_copy_only=True)
+        if spec['kind'] == 'category':
+            values = pd.Categorical.from_codes(values, categories=spec['categories'], validate=False)
+        elif spec['kind'] == 'bool':
+            values = values.view(np.bool_)
+        elif spec['kind'] == 'nullable':
+            mask = table.column(spec['mask']).combine_chunks().to_numpy(zero_copy_only=True)
+            values = pd.arrays.IntegerArray(values, mask.view(np.bool_))
+        data[col] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load(path=DATA_PATH, version=None, cache_dir=None):
+    """Filas del CSV desde el archivo compartido, creándolo si falta o está desactualizado.
+
+    Sin pyarrow o sin permisos de escritura devuelve el DataFrame en memoria.
+    """
+    if pa is None:
+        return load_dataset(path)
+    shared_path = cache.shared_path(path, cache_dir)
+    frame = attach(shared_path, version)
+    if frame is not None:
+        return frame
+    frame = load_dataset(path)
+    try:
+        os.makedirs(os.path.dirname(shared_path), exist_ok=True)
+        export(frame, shared_path, version)
+    except OSError:
+        return frame
+    return attach(shared_path, version)
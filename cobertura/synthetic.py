@@ -0,0 +1,55 @@
+"""Datos sintéticos para pruebas de rendimiento.
+
+También se puede generar un CSV con el formato del original (SÍ/NO, mismas
+columnas) para medir la carga completa:
+
+    python -m cobertura.synthetic sintetico_1m.csv --rows 1000000
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from cobertura.loader import DATA_PATH
+
+CHUNK_ROWS = 500_000
+
+
+def expand_sample(df, rows, seed=0):
+    """Remuestrea con reemplazo las filas del CSV hasta tener `rows` filas.
+
+    Conserva los tipos, las cardinalidades y las tasas de SÍ/NO del original.
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.integers(0, len(df), size=rows)
+    return df.take(positions).reset_index(drop=True)
+
+
+def write_csv(path, rows, seed=0, source=DATA_PATH, chunksize=CHUNK_ROWS):
+    """Escribe un CSV de `rows` filas remuestreadas del original, por bloques.
+
+    Departamentos, municipios, proveedores y años son los del CSV original y
+    las tasas de SÍ/NO se conservan; la memoria usada no depende de `rows`.
+    """
+    sample = pd.read_csv(source, dtype=str, keep_default_na=False)
+    written = 0
+    for number, start in enumerate(range(0, rows, chunksize)):
+        block = expand_sample(sample, min(chunksize, rows - start), seed + number)
+        block.to_csv(path, mode='w' if number == 0 else 'a', header=number == 0, index=False)
+        written += len(block)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera un CSV sintético con el esquema del original.')
+    parser.add_argument('path', help='CSV de salida')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source', default=DATA_PATH, help='CSV original a remuestrear')
+    args = parser.parse_args()
+    print(f'Filas: {write_csv(args.path, args.rows, args.seed, args.source):,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Componentes de Streamlit compartidos por los dashboards."""
+
+import os
+
+import pandas as pd
+import streamlit as st
+
+from cobertura import aggregates, export, profiling
+from cobertura.memo import cache_stats, clear_caches
+
+DEBUG_ENV = 'COBERTURA_DEBUG'
+SECTION_KEY = 'section'
+
+PAGE_SIZES = [25, 50, 100, 250]
+ORIGINAL_ORDER = "(orden original)"
+
+
+def section_selector(labels, key=SECTION_KEY):
+    """Navegación por secciones con un radio horizontal.
+
+    A diferencia de `st.tabs`, que ejecuta el cuerpo de todas las pestañas en
+    cada rerun, el dashboard solo ejecuta la sección elegida.
+    """
+    return st.radio("Sección", labels, horizontal=True, key=key, label_visibility="collapsed")
+
+
+def paged_table(dataset, selection, key='tabla'):
+    """Tabla de filas de la selección paginada en el servidor.
+
+    Columnas, orden y página se eligen con widgets y se resuelven en
+    `aggregates.table_page`: al navegador solo viaja la página visible.
+    """
+    columns = st.multiselect("Columnas", dataset.columns, default=dataset.columns, key=f'{key}_columnas')
+    if not columns:
+        st.info("Elige al menos una columna.")
+        return
+    col1, col2, col3 = st.columns([2, 1, 1])
+    sort = col1.selectbox("Ordenar por", [ORIGINAL_ORDER, *columns], key=f'{key}_orden')
+    ascending = col2.radio("Sentido", ["Ascendente", "Descendente"], horizontal=True,
+                           key=f'{key}_sentido') == "Ascendente"
+    page_size = col3.selectbox("Filas por página", PAGE_SIZES, index=PAGE_SIZES.index(aggregates.PAGE_SIZE),
+                               key=f'{key}_tamano')
+    total = dataset.cube.count(where=selection)
+    pages = max((total - 1) // page_size + 1, 1)
+    # El valor vive solo en session_state: con otros filtros o más filas por página
+    # la página elegida puede ya no existir y se ajusta antes de crear el widget
+    page_key = f'{key}_pagina'
+    if page_key not in st.session_state:
+        st.session_state[page_key] = 1
+    elif st.session_state[page_key] > pages:
+        st.session_state[page_key] = pages
+    page = st.number_input(f"Página (de {pages:,})", min_value=1, max_value=pages, step=1, key=page_key)
+    rows, total = aggregates.table_page(dataset, selection, columns, None if sort == ORIGINAL_ORDER else sort,
+                                        ascending, int(page) - 1, page_size)
+    st.dataframe(rows, use_container_width=True)
+    if len(rows):
+        st.caption(f"Filas {rows.index[0]:,}–{rows.index[-1]:,} de {total:,}")
+
+
+def export_buttons(table, name):
+    """Botones CSV y Parquet con la tabla de agregados de un gráfico.
+
+    El archivo se genera al hacer clic, en un hilo aparte del rerun.
+    """
+    columns = st.columns(len(export.FORMATS) + 2)
+    for column, fmt in zip(columns, export.FORMATS):
+        column.download_button(
+            f"⬇️ {fmt.upper()}", lambda fmt=fmt: export.to_bytes(export.table_chunks(table), fmt),
+            file_name=export.file_name(name, fmt), mime=export.FORMATS[fmt],
+            key=f'exportar_{name}_{fmt}', on_click='ignore',
+        )
+
+
+def selection_export(dataset, selection, key='exportar_seleccion'):
+    """Descarga de las filas de la selección en la barra lateral.
+
+    Con `COBERTURA_EXPORT_PORT` el enlace apunta al servidor de
+    `cobertura.export`, que transmite el archivo por bloques sin guardarlo
+    completo; si no, el archivo se arma por bloques en un temporal al hacer
+    clic, en un hilo aparte del rerun.
+    """
+    with st.sidebar.expander("📥 Exportar selección"):
+        fmt = st.radio("Formato", list(export.FORMATS), horizontal=True, format_func=str.upper,
+                       key=f'{key}_formato')
+        label = f"⬇️ Descargar {dataset.cube.count(where=selection):,} filas"
+        port = os.environ.get(export.EXPORT_PORT_ENV)
+        if port:
+            export.serve(port)
+            st.link_button(label, export.url(export.register(dataset, selection, fmt)), use_container_width=True)
+        else:
+            st.download_button(
+                label, lambda: export.to_file(export.row_chunks(dataset, selection), fmt),
+                file_name=export.file_name('cobertura_filtrada', fmt), mime=export.FORMATS[fmt],
+                key=f'{key}_boton', on_click='ignore', use_container_width=True,
+            )
+
+
+def debug_enabled():
+    """Panel de depuración activo con `?debug=1` en la URL o `COBERTURA_DEBUG=1`."""
+    if st.query_params.get('debug') == '1':
+        return True
+    return os.environ.get(DEBUG_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+def start_profiling(label):
+    """Instrumenta el rerun si hay panel de depuración o `COBERTURA_PROFILE=1`.
+
+    Con `COBERTURA_METRICS_PORT` también sirve `/metrics` para Prometheus.
+    """
+    port = os.environ.get(profiling.METRICS_PORT_ENV)
+    if port:
+        profiling.serve_metrics(port)
+    return profiling.start(label, enabled=debug_enabled() or profiling.env_enabled() or bool(port))
+
+
+def profile_panel(records):
+    """Tiempo, CPU, filas y memoria de cada sección del rerun en la barra lateral."""
+    if not records or not debug_enabled():
+        return
+    with st.sidebar.expander("⏱️ Tiempos del rerun"):
+        table = pd.DataFrame(records)
+        table['seccion'] = ['  ' * level + name for level, name in zip(table.pop('nivel'), table['seccion'])]
+        st.dataframe(table.set_index('seccion').round(1), use_container_width=True)
+        if st.checkbox("Ver métricas de Prometheus", key='debug_metrics'):
+            st.code(profiling.metrics_text(), language='text')
+
+
+def debug_panel(dataset):
+    """Aciertos y fallos de las cachés de resultados en la barra lateral."""
+    if not debug_enabled():
+        return
+    with st.sidebar.expander("🐞 Depuración de cachés"):
+        st.caption(f"Versión del dataset: {dataset.version} · motor: {dataset.backend.name}")
+        stats = pd.DataFrame(cache_stats())
+        if not stats.empty:
+            st.dataframe(stats.set_index('cache'), use_container_width=True)
+        engine = dataset.filters
+        if engine is not None:
+            st.caption(f"Índice de filtros: {engine.hits} aciertos, {engine.misses} fallos")
+        if st.button("🧹 Vaciar cachés de resultados"):
+            clear_caches()
+            st.rerun()
@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from cobertura import Dataset
+from cobertura import aggregates, images
+from cobertura import precompute, report
+from cobertura.memory import MemoryGuard
+from cobertura import profiling
+from cobertura.ui import debug_panel, profile_panel, section_selector, selection_export, start_profiling
 
 # Configuración de la página
 st.set_page_config(
@@ -16,25 +18,36 @@ st.set_page_config(
 st.title("📱 Dashboard de Cobertura Móvil en Colombia 2017-2024")
 st.markdown("Análisis integral de la cobertura de telecomunicaciones móviles en Colombia")
 
-# Función para cargar datos
-@st.cache_data
-def load_data():
+# Función para cargar datos: filas, cubo e índice de filtros compartidos por todas las sesiones.
+# `version` cambia al agregar un trimestre y fuerza la recarga; solo se conserva la última versión.
+@st.cache_resource(max_entries=1)
+def load_data(version):
     try:
-        df = pd.read_csv('cobertura_colombia_2017_2024_limpio_V2.csv')
-        return df
+        dataset = Dataset.load()
+        # Agregados y figuras de las vistas frecuentes, si se precalcularon (ver cobertura.precompute)
+        precompute.load(dataset)
+        return dataset
     except Exception as e:
         st.error(f"Error al cargar los datos: {e}")
         return None
 
+# Pico de memoria por rerun (opcional, ver cobertura.memory)
+memory_guard = MemoryGuard.from_env().start()
+
+# Tiempos por sección (opcional, ver cobertura.profiling)
+start_profiling('dashboard_simple')
+
 # Cargar datos
-df = load_data()
+profiling.phase('carga')
+dataset = load_data(Dataset.version_token())
 
-if df is not None:
+if dataset is not None:
     # Sidebar - Filtros
+    profiling.phase('filtros')
     st.sidebar.header("🎛️ Filtros")
     
     # Filtro de año
-    years = sorted(df['AÑO'].unique())
+    years = dataset.years
     selected_years = st.sidebar.multiselect(
         "Seleccionar Años:",
         years,
@@ -42,7 +55,7 @@ if df is not None:
     )
     
     # Filtro de departamento
-    departments = sorted(df['DEPARTAMENTO'].unique())
+    departments = dataset.departments
     selected_departments = st.sidebar.multiselect(
         "Seleccionar Departamentos:",
         departments,
@@ -50,79 +63,70 @@ if df is not None:
     )
     
     # Filtro de proveedor
-    providers = sorted(df['NOMBRE_PROVEEDOR_COMERCIAL'].unique())
+    providers = dataset.providers
     selected_providers = st.sidebar.multiselect(
         "Seleccionar Proveedores:",
         providers,
         default=providers
     )
     
-    # Filtrar datos
-    filtered_df = df[
-        (df['AÑO'].isin(selected_years)) &
-        (df['DEPARTAMENTO'].isin(selected_departments)) &
-        (df['NOMBRE_PROVEEDOR_COMERCIAL'].isin(selected_providers))
-    ]
+    # Selección de la barra lateral, común al cubo y al índice de filas
+    selection = report.selection(selected_years, selected_departments, selected_providers)
+    selection_export(dataset, selection)
+    
+    # Cada gráfico se calcula con una función memoizada de (versión del dataset, selección)
+    overview = aggregates.overview(dataset, selection)
     
     # Métricas principales
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_records = len(filtered_df)
+        total_records = overview['registros']
         st.metric("📊 Total de Registros", f"{total_records:,}")
     
     with col2:
-        total_departments = filtered_df['DEPARTAMENTO'].nunique()
+        total_departments = overview['departamentos']
         st.metric("🏛️ Departamentos", total_departments)
     
     with col3:
-        total_municipalities = filtered_df['MUNICIPIO'].nunique()
+        total_municipalities = overview['municipios']
         st.metric("🏘️ Municipios", total_municipalities)
     
     with col4:
-        total_providers = filtered_df['NOMBRE_PROVEEDOR_COMERCIAL'].nunique()
+        total_providers = overview['proveedores']
         st.metric("📡 Proveedores", total_providers)
     
-    # Tabs para diferentes secciones
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    # Secciones: solo se calcula y dibuja la que está seleccionada
+    sections = [
         "📈 Cobertura", 
         "🗺️ Geografía", 
         "🏢 Proveedores",
         "💰 Socioeconomía", 
         "📅 Series Tiempo"
-    ])
+    ]
+    section = section_selector(sections)
+    profiling.phase(f'sección: {section}')
     
-    with tab1:
+    if section == sections[0]:
         st.header("📈 Análisis de Cobertura por Tecnología")
         
         # Calcular cobertura por tecnología
-        coverage_cols = ['COBERTURA_2G', 'COBERTURA_3G', 'COBERTURA_4G', 'COBERTURA_5G']
-        coverage_summary = {}
-        
-        for col in coverage_cols:
-            coverage_summary[col.replace('COBERTURA_', '')] = (filtered_df[col] == 'SÍ').sum()
-        
-        # Gráfico de barras
-        fig, ax = plt.subplots(figsize=(10, 6))
-        technologies = list(coverage_summary.keys())
-        counts = list(coverage_summary.values())
-        
-        bars = ax.bar(technologies, counts, color=['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4'])
-        ax.set_title('Cobertura por Tecnología (Total de Localidades)', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Tecnología')
-        ax.set_ylabel('Número de Localidades')
+        coverage_counts = aggregates.coverage_summary(dataset, selection, ['2G', '3G', '4G', '5G'])
+        coverage_summary = coverage_counts.to_dict()
         
-        # Añadir valores en las barras
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                   f'{int(height):,}', ha='center', va='bottom')
-        
-        st.pyplot(fig)
+        # Gráfico de barras (imagen memoizada, ver cobertura.images)
+        chart = images.bar_chart(
+            coverage_counts,
+            'Cobertura por Tecnología (Total de Localidades)',
+            'Tecnología', 'Número de Localidades',
+            ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4'],
+            figsize=(10, 6), rotate=False
+        )
+        st.image(chart, use_container_width=True)
         
         # Porcentajes
         st.subheader("📊 Porcentaje de Cobertura")
-        total_locations = len(filtered_df)
+        total_locations = total_records
         
         col1, col2, col3, col4 = st.columns(4)
         for i, (tech, count) in enumerate(coverage_summary.items()):
@@ -136,173 +140,102 @@ if df is not None:
             else:
                 col4.metric(f"⚡ {tech}", f"{pct:.1f}%")
     
-    with tab2:
+    if section == sections[1]:
         st.header("🗺️ Análisis Geográfico")
         
         # Top departamentos
-        dept_counts = filtered_df['DEPARTAMENTO'].value_counts().head(10)
-        
-        fig, ax = plt.subplots(figsize=(12, 6))
-        bars = ax.bar(range(len(dept_counts)), dept_counts.values, color='skyblue')
-        ax.set_title('Top 10 Departamentos por Número de Registros', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Departamento')
-        ax.set_ylabel('Número de Registros')
-        ax.set_xticks(range(len(dept_counts)))
-        ax.set_xticklabels(dept_counts.index, rotation=45, ha='right')
+        dept_counts = aggregates.value_counts(dataset, selection, 'DEPARTAMENTO').head(10)
         
-        # Añadir valores
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                   f'{int(height):,}', ha='center', va='bottom')
-        
-        st.pyplot(fig)
+        chart = images.bar_chart(
+            dept_counts,
+            'Top 10 Departamentos por Número de Registros',
+            'Departamento', 'Número de Registros', 'skyblue'
+        )
+        st.image(chart, use_container_width=True)
         
         # Análisis por cabecera municipal
-        cabecera_analysis = filtered_df['CABECERA_MUNICIPAL'].value_counts()
-        fig, ax = plt.subplots(figsize=(8, 6))
-        ax.pie(cabecera_analysis.values, labels=cabecera_analysis.index, autopct='%1.1f%%', startangle=90)
-        ax.set_title('Distribución: Cabecera vs No Cabecera', fontsize=14, fontweight='bold')
-        st.pyplot(fig)
+        cabecera_analysis = aggregates.value_counts(dataset, selection, 'CABECERA_MUNICIPAL')
+        chart = images.pie_chart(cabecera_analysis, 'Distribución: Cabecera vs No Cabecera')
+        st.image(chart, use_container_width=True)
     
-    with tab3:
+    if section == sections[2]:
         st.header("🏢 Análisis por Proveedor")
         
         # Distribución de registros por proveedor
-        provider_counts = filtered_df['NOMBRE_PROVEEDOR_COMERCIAL'].value_counts()
-        
-        fig, ax = plt.subplots(figsize=(12, 6))
-        bars = ax.bar(range(len(provider_counts)), provider_counts.values, color='lightgreen')
-        ax.set_title('Número de Registros por Proveedor', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Proveedor')
-        ax.set_ylabel('Número de Registros')
-        ax.set_xticks(range(len(provider_counts)))
-        ax.set_xticklabels(provider_counts.index, rotation=45, ha='right')
+        provider_counts = aggregates.value_counts(dataset, selection, 'NOMBRE_PROVEEDOR_COMERCIAL')
         
-        # Añadir valores
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                   f'{int(height):,}', ha='center', va='bottom')
-        
-        st.pyplot(fig)
+        chart = images.bar_chart(
+            provider_counts,
+            'Número de Registros por Proveedor',
+            'Proveedor', 'Número de Registros', 'lightgreen'
+        )
+        st.image(chart, use_container_width=True)
     
-    with tab4:
+    if section == sections[3]:
         st.header("💰 Análisis Socioeconómico")
         
         # Ingreso promedio por departamento
-        ingreso_dept = filtered_df.groupby('DEPARTAMENTO')['INGRESO_PROMEDIO_HOGAR'].mean().sort_values(ascending=False).head(10)
-        
-        fig, ax = plt.subplots(figsize=(12, 6))
-        bars = ax.bar(range(len(ingreso_dept)), ingreso_dept.values, color='gold')
-        ax.set_title('Top 10 Departamentos por Ingreso Promedio', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Departamento')
-        ax.set_ylabel('Ingreso Promedio')
-        ax.set_xticks(range(len(ingreso_dept)))
-        ax.set_xticklabels(ingreso_dept.index, rotation=45, ha='right')
-        
-        # Añadir valores
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                   f'${int(height):,}', ha='center', va='bottom')
+        ingreso_dept = aggregates.top_departments(dataset, selection, 'INGRESO_PROMEDIO_HOGAR')
         
-        st.pyplot(fig)
+        chart = images.bar_chart(
+            ingreso_dept,
+            'Top 10 Departamentos por Ingreso Promedio',
+            'Departamento', 'Ingreso Promedio', 'gold',
+            label_format='${:,}'
+        )
+        st.image(chart, use_container_width=True)
         
         # Tasa de pobreza
-        pobreza_dept = filtered_df.groupby('DEPARTAMENTO')['TASA_POBREZA'].mean().sort_values(ascending=False).head(10)
+        pobreza_dept = aggregates.top_departments(dataset, selection, 'TASA_POBREZA')
         
-        fig, ax = plt.subplots(figsize=(10, 6))
-        bars = ax.barh(range(len(pobreza_dept)), pobreza_dept.values, color='salmon')
-        ax.set_title('Top 10 Departamentos con Mayor Tasa de Pobreza', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Tasa de Pobreza (%)')
-        ax.set_ylabel('Departamento')
-        ax.set_yticks(range(len(pobreza_dept)))
-        ax.set_yticklabels(pobreza_dept.index)
-        
-        # Añadir valores
-        for i, bar in enumerate(bars):
-            width = bar.get_width()
-            ax.text(width, bar.get_y() + bar.get_height()/2.,
-                   f'{width:.1f}%', ha='left', va='center')
-        
-        st.pyplot(fig)
+        chart = images.barh_chart(
+            pobreza_dept,
+            'Top 10 Departamentos con Mayor Tasa de Pobreza',
+            'Tasa de Pobreza (%)', 'Departamento', 'salmon',
+            label_format='{:.1f}%'
+        )
+        st.image(chart, use_container_width=True)
     
-    with tab5:
+    if section == sections[4]:
         st.header("📅 Análisis de Series de Tiempo")
         
         # Evolución por año
-        yearly_data = filtered_df.groupby('AÑO').agg({
-            'INGRESO_PROMEDIO_HOGAR': 'mean',
-            'TASA_POBREZA': 'mean',
-            'PCT_HOGARES_INTERNET': 'mean'
-        }).reset_index()
-        
-        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 12))
-        
-        # Ingreso promedio
-        ax1.plot(yearly_data['AÑO'], yearly_data['INGRESO_PROMEDIO_HOGAR'], marker='o', color='blue', linewidth=2)
-        ax1.set_title('Evolución del Ingreso Promedio por Año', fontsize=12, fontweight='bold')
-        ax1.set_ylabel('Ingreso Promedio')
-        ax1.grid(True, alpha=0.3)
-        
-        # Tasa de pobreza
-        ax2.plot(yearly_data['AÑO'], yearly_data['TASA_POBREZA'], marker='s', color='red', linewidth=2)
-        ax2.set_title('Evolución de la Tasa de Pobreza por Año', fontsize=12, fontweight='bold')
-        ax2.set_ylabel('Tasa de Pobreza (%)')
-        ax2.grid(True, alpha=0.3)
-        
-        # Hogares con Internet
-        ax3.plot(yearly_data['AÑO'], yearly_data['PCT_HOGARES_INTERNET'], marker='^', color='green', linewidth=2)
-        ax3.set_title('Evolución del % de Hogares con Internet por Año', fontsize=12, fontweight='bold')
-        ax3.set_xlabel('Año')
-        ax3.set_ylabel('% Hogares con Internet')
-        ax3.grid(True, alpha=0.3)
+        yearly_data = aggregates.yearly_means(
+            dataset, selection,
+            ['INGRESO_PROMEDIO_HOGAR', 'TASA_POBREZA', 'PCT_HOGARES_INTERNET']
+        )
         
-        plt.tight_layout()
-        st.pyplot(fig)
+        chart = images.line_panels(
+            yearly_data, 'AÑO',
+            [
+                ('INGRESO_PROMEDIO_HOGAR', 'Evolución del Ingreso Promedio por Año', 'Ingreso Promedio', 'o', 'blue'),
+                ('TASA_POBREZA', 'Evolución de la Tasa de Pobreza por Año', 'Tasa de Pobreza (%)', 's', 'red'),
+                ('PCT_HOGARES_INTERNET', 'Evolución del % de Hogares con Internet por Año', '% Hogares con Internet', '^', 'green'),
+            ],
+            'Año'
+        )
+        st.image(chart, use_container_width=True)
     
     # Resumen ejecutivo
     st.header("📋 Resumen Ejecutivo")
     
     col1, col2, col3 = st.columns(3)
     
+    indicators = report.key_indicators(dataset, selection, best_department=False)
+    
     with col1:
-        avg_4g = (filtered_df['COBERTURA_4G'] == 'SÍ').mean() * 100
-        st.metric("📡 Cobertura 4G", f"{avg_4g:.1f}%")
+        st.metric("📡 Cobertura 4G", f"{indicators['cobertura_4g']:.1f}%")
     
     with col2:
-        avg_5g = (filtered_df['COBERTURA_5G'] == 'SÍ').mean() * 100
-        st.metric("🚀 Cobertura 5G", f"{avg_5g:.1f}%")
+        st.metric("🚀 Cobertura 5G", f"{indicators['cobertura_5g']:.1f}%")
     
     with col3:
-        avg_internet = filtered_df['PCT_HOGARES_INTERNET'].mean()
-        st.metric("🌐 Internet Hogares", f"{avg_internet:.1f}%")
+        st.metric("🌐 Internet Hogares", f"{indicators['internet']:.1f}%")
     
     # Principales hallazgos
     st.subheader("🔍 Principales Hallazgos")
     
-    findings = []
-    
-    if avg_4g > 70:
-        findings.append(f"✅ Buena cobertura 4G: El {avg_4g:.1f}% de las localidades tiene cobertura 4G")
-    else:
-        findings.append(f"⚠️ Cobertura 4G limitada: Solo el {avg_4g:.1f}% de las localidades tiene cobertura 4G")
-    
-    if avg_5g > 5:
-        findings.append(f"🚀 Despliegue de 5G: El {avg_5g:.1f}% de las localidades ya tiene cobertura 5G")
-    else:
-        findings.append(f"📱 5G en desarrollo: Solo el {avg_5g:.1f}% de las localidades tiene cobertura 5G")
-    
-    if avg_internet < 60:
-        findings.append(f"⚠️ Brecha digital: Solo el {avg_internet:.1f}% de los hogares tiene acceso a Internet")
-    else:
-        findings.append(f"✅ Buena penetración: El {avg_internet:.1f}% de los hogares tiene acceso a Internet")
-    
-    # Proveedor líder
-    top_provider = filtered_df['NOMBRE_PROVEEDOR_COMERCIAL'].value_counts().index[0]
-    top_provider_count = filtered_df['NOMBRE_PROVEEDOR_COMERCIAL'].value_counts().iloc[0]
-    findings.append(f"🏆 Proveedor líder: {top_provider} con {top_provider_count:,} registros")
+    findings = report.findings(indicators, bold=False, best_department=False)
     
     for finding in findings:
         st.markdown(finding)
@@ -324,6 +257,16 @@ if df is not None:
 else:
     st.error("❌ No se pudieron cargar los datos. Por favor, verifica que el archivo CSV existe.")
 
+records = profiling.finish()
+if dataset is not None:
+    debug_panel(dataset)
+profile_panel(records)
+
+if memory_guard.stop() is not None:
+    st.sidebar.caption(f"🧠 Pico de memoria del rerun: {memory_guard.peak_mb:.1f} MB")
+    if memory_guard.exceeded:
+        st.sidebar.warning(f"⚠️ El rerun superó el límite de {memory_guard.limit_mb:.0f} MB")
+
 # Footer
 st.markdown("---")
 st.markdown("📊 Dashboard de Cobertura Móvil Colombia | Desarrollado con Streamlit | Datos 2017-2024")
\ No newline at end of file